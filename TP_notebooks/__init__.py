@@ -0,0 +1,20 @@
+'''
+Burgers 1D data assimilation practicals
+
+The computational modules (model, covariances, observation operator,
+variational cost function and Kalman filter analysis) only depend on numpy
+and scipy. Plotting helpers are loaded on first access to the plots
+attribute, which imports matplotlib.
+'''
+import importlib
+
+from .burgers import Burgers
+from .gausscov import gausscov
+from .obsopt import Obsopt
+from .simvar import Variational
+from .analyseKF import analyseKF
+
+def __getattr__(name):
+    if name=='plots':
+        return importlib.import_module('.plots',__name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__,name))
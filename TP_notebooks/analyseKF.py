@@ -1,19 +1,76 @@
 import scipy.linalg as lin
 import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spl
+try:
+    from . import obscov
+    from .profiler import noprof
+except ImportError: # run as a script from TP_notebooks
+    import obscov
+    from profiler import noprof
 
-def analyseKF(up,Sp,H,yo,R):
+def _dense(S):
+    # square root given as a sparse matrix or a LinearOperator (e.g. the
+    # factor of gccov): the analysis square root is dense anyway
+    if sp.issparse(S):
+        return S.toarray()
+    if isinstance(S,spl.LinearOperator):
+        return S.matmat(np.eye(S.shape[1]))
+    return np.array(S,dtype=float)
+
+def analyseKF(up,Sp,H,yo,R,prof=noprof):
     # Kalman filter analysis
   
+    Sp = _dense(Sp)
     #Kalman gain
-    HS = np.dot(H,Sp)
-    Kg = np.dot( np.dot(Sp,HS.T) ,
-                 lin.inv( np.dot(HS,HS.T) + R ) )
+    with prof.phase('kf_gain'):
+        HS = np.dot(H,Sp)
+        Kg = np.dot( np.dot(Sp,HS.T) ,
+                     lin.inv( np.dot(HS,HS.T) + R ) )
     # Analysis
-    uu =  up + np.dot(Kg,
-                      yo-np.dot(H,up) )
-    P  =  np.dot( Sp-np.dot(Kg,HS) ,
-                  Sp.T )
-    P  = 0.5 * (P+P.T)          # we force symmetry
-    S  = lin.sqrtm(P)         # square root decomposition of Pf
+    with prof.phase('kf_update'):
+        uu =  up + np.dot(Kg,
+                          yo-np.dot(H,up) )
+        P  =  np.dot( Sp-np.dot(Kg,HS) ,
+                      Sp.T )
+        P  = 0.5 * (P+P.T)          # we force symmetry
+    with prof.phase('sqrtm'):
+        S  = lin.sqrtm(P)         # square root decomposition of Pf
+
+    return uu, S
+
+def analyseKF_serial(up,Sp,H,yo,R,prof=noprof):
+    # Kalman filter analysis, assimilating the observations one at a time
+    # (R diagonal, given as a vector of variances) or by independent blocks
+    # (R block diagonal, given as a list of matrices), see obscov.
+    # The square root S of P is updated at each step (Potter's rank-one
+    # update, Andrews' formula for blocks): no nobs x nobs inverse, and the
+    # returned S is a non-symmetric square root, P = S S^T
+
+    uu = np.array(up,dtype=float)
+    S  = _dense(Sp)
+    for i0,i1,Rk in obscov.blocks(R):
+        Hk = H[i0:i1]
+        if np.ndim(Rk)==0:
+            with prof.phase('kf_gain'):
+                a     = np.ravel(Hk.dot(S))   # H S for one observation
+                alpha = a.dot(a) + Rk         # innovation variance
+                Kg    = S.dot(a)/alpha
+            with prof.phase('kf_update'):
+                uu    = uu + Kg*(yo[i0]-Hk.dot(uu)[0])
+                gamma = 1./(1.+np.sqrt(Rk/alpha))
+                S     = S - gamma*np.outer(Kg,a)
+        else:
+            with prof.phase('kf_gain'):
+                A  = Hk.dot(S)
+                W  = lin.cholesky(np.dot(A,A.T)+Rk,lower=True)
+                SA = np.dot(S,A.T)
+                Kg = lin.solve_triangular(W,lin.solve_triangular(W,SA.T,lower=True),
+                                          lower=True,trans='T').T
+            with prof.phase('kf_update'):
+                uu = uu + np.dot(Kg,yo[i0:i1]-Hk.dot(uu))
+                Rs = lin.cholesky(Rk,lower=True)
+                S  = S - np.dot(lin.solve_triangular(W,SA.T,lower=True).T,
+                                lin.solve(W+Rs,A))
 
     return uu, S
@@ -20,12 +20,13 @@ class Burgers:
         ''' 
         Burgers 1D model
          Entries:
-         up : input field
+         up : input field, or (nens,nx) array of fields
         '''
 
         # shift up upwind [um1] and downwind [up1] for integration
-        up1=np.roll(up,-1)
-        um1=np.roll(up,1)
+        # (along the last axis: up may stack the members of an ensemble)
+        up1=np.roll(up,-1,axis=-1)
+        um1=np.roll(up,1,axis=-1)
         # u^2/2,x term is centre-discretized:
         B=0.25*self.cfl*(um1*um1-up1*up1)
         if self.ns==0 : # Lax-Friedrich
@@ -0,0 +1,32 @@
+'''
+Check that TP_notebooks imports as a package from its parent directory
+(and not only as flat modules from TP_notebooks itself)
+ Usage: python TP_notebooks/check_import.py, from any directory
+'''
+import os
+import sys
+import importlib
+
+here=os.path.dirname(os.path.abspath(__file__))
+# the package directory itself must not be on the path, or the flat
+# imports of the modules would succeed and hide a broken package
+sys.path=[ p for p in sys.path if os.path.abspath(p or '.')!=here ]
+sys.path.insert(0,os.path.dirname(here))
+
+modules=['analyseKF','burgers','cyclevar','diffcov','expsetup','gausscov',
+         'gccov','multires','obscov','obsio','obsnet','obsopt','parareal',
+         'profiler','simvar','superobs','transfer','weakvar']
+
+failed=[]
+for m in ['']+modules:
+    name='TP_notebooks'+('.'+m if m else '')
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        failed.append((name,e))
+        print('%s: %s'%(name,e))
+if 'matplotlib' in sys.modules:
+    failed.append(('matplotlib',None))
+    print('matplotlib imported by the package')
+print('package import:', 'FAILED' if failed else 'ok')
+sys.exit(1 if failed else 0)
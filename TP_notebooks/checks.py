@@ -0,0 +1,126 @@
+from burgers import *
+from gausscov import *
+from obsopt import *
+from simvar import *
+from weakvar import *
+from multires import *
+from analyseKF import *
+
+import numpy as np
+import scipy.linalg as lin
+import math
+import sys
+
+# Consistency checks of the assimilation schemes, in the spirit of testvar.py:
+#  - the serial Kalman analysis (observations one at a time or by blocks)
+#    against the batch one, mean and covariance
+#  - the gradients of the variational costs against finite differences,
+#    (J(v+eps d)-J(v-eps d))/(2 eps g.d) along a random direction d
+#  - a final outer loop at full resolution of the multi-resolution 4D-Var
+#    does not increase the analysis error, as the ratio of the rmse with
+#    levels (2,2,1) to that with levels (2,2)
+# Usage: python checks.py, exits with 1 on failure
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+sigmaq = 0.01              # Model error std
+Lb = 0.05                  # Correlation length for B matrix
+
+iobstsub = 5                # Frequency of temporal subsampling of observations
+iobsxsub = 4                # Frequency of spatial subsampling of observations
+nsub = 4                    # number of sub-windows of the weak-constraint 4D-Var
+nens = 10                   # number of ensemble members of the hybrid 4D-Var
+seed = 0                    # Seed of the observation noise and perturbations
+
+tolkf = 1.e-12              # tolerance on the serial Kalman analysis
+tolgrad = 1.e-05            # tolerance on the gradient ratio
+eps = 1.e-06                # finite difference step
+
+np.random.seed(seed)
+failed=[]
+
+def report(name,err,tol):
+    ok=err<=tol
+    if not ok:
+        failed.append(name)
+    print('%-40s %10.2e  %s'%(name,err,'ok' if ok else 'FAILED'))
+
+M=Burgers(nx,dx,dt,ns)
+H=Obsopt(nx,iobsxsub,nt,iobstsub)
+uo=np.sin(2*math.pi*xx)
+true=H.gen_obs(M,uo,sigmao)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+ub=np.cos(2.*math.pi*xx)
+B=gausscov(nx,sigmab,Lb,2)
+B.sqr=np.real(B.sqr)
+
+# Serial against batch Kalman analysis
+
+Hm=H.mat.toarray() if hasattr(H.mat,'toarray') else np.asarray(H.mat)
+yo=H.yo[0]
+var=sigmao*sigmao*np.random.uniform(0.5,2.,H.nobs)
+Rblk=[ np.diag(var[i:i+2])+0.3*sigmao*sigmao for i in range(0,H.nobs,2) ]
+for name,Rs,Rd in [('analyseKF_serial, diagonal R',var,np.diag(var)),
+                   ('analyseKF_serial, block diagonal R',Rblk,lin.block_diag(*Rblk))]:
+    ua,Sa=analyseKF(ub,B.sqr,Hm,yo,Rd)
+    Pa=np.real(Sa.dot(Sa.T))
+    us,Ss=analyseKF_serial(ub,B.sqr,Hm,yo,Rs)
+    err=max(np.max(np.abs(us-np.real(ua)))/np.max(np.abs(ua)),
+            np.max(np.abs(Ss.dot(Ss.T)-Pa))/np.max(np.abs(Pa)))
+    report(name,err,tolkf)
+
+# Gradients against finite differences
+
+def gradtest(var,n,scale=1.):
+    v=scale*np.random.normal(0.,1.,n)
+    d=scale*np.random.normal(0.,1.,n)
+    g=var.grad(v)
+    fd=(var.cost(v+eps*d)-var.cost(v-eps*d))/(2.*eps)
+    return abs(fd/g.dot(d)-1.)
+
+report('Variational, preconditioned',
+       gradtest(Variational(ub,nt,B,M,H,R,True),nx),tolgrad)
+# the unpreconditioned control is the increment itself, of size sigmab
+report('Variational, not preconditioned',
+       gradtest(Variational(ub,nt,gausscov(nx,sigmab,Lb,1),M,H,R,False),nx,sigmab),tolgrad)
+
+ubkg=[ub]
+for it in range(nt):
+    ubkg.append(M.step(ubkg[-1]))
+Q=gausscov(nx,sigmaq,Lb,2)
+Q.sqr=np.real(Q.sqr)
+for form in ['forcing','state']:
+    var=WeakVariational(ubkg,nt,nsub,B,Q,M,H,R,None,form)
+    report('WeakVariational, %s'%form,gradtest(var,nsub*nx),tolgrad)
+    var.close()
+
+X=ensemble(M,ub,B.sqr,nens,5)
+Lsqr=np.real(gausscov(nx,1.,0.1,2).sqr)
+for name,L in [('HybridVariational',None),('HybridVariational, localised',Lsqr)]:
+    var=HybridVariational(ub,nt,B,M,H,R,X,0.5,0.5,L)
+    report(name,gradtest(var,var.nctl),tolgrad)
+
+# Final fine outer loop of the multi-resolution 4D-Var
+# (observations every 4 steps, a period the coarsening factor 2 divides)
+
+H=Obsopt(nx,iobsxsub,nt,4)
+true=H.gen_obs(M,uo,sigmao)
+R = sigmao*sigmao*np.ones(H.nobs)
+ub=uo + B.sqr.dot(np.random.normal(0.,1.,nx))
+rmse={}
+for levels in [(2,2),(2,2,1)]:
+    ua,stats=MultiResVariational(ub,nt,M,H,R,sigmab,Lb,levels).run()
+    rmse[levels]=np.sqrt(np.mean((ua-true[0])**2))
+report('MultiResVariational, final fine loop',rmse[(2,2,1)]/rmse[(2,2)],1.)
+
+print('checks:', 'FAILED' if failed else 'ok')
+sys.exit(1 if failed else 0)
@@ -0,0 +1,194 @@
+import time
+import numpy as np
+import scipy.optimize as opt
+try:
+    from .simvar import Variational
+except ImportError: # run as a script from TP_notebooks
+    from simvar import Variational
+
+
+def twoloop(q,pairs,h0):
+    '''
+    L-BFGS two-loop recursion: product of the inverse Hessian approximation
+    built from the curvature pairs (s,y) with the vector q
+     Entries:
+     h0 : function applying the initial inverse Hessian approximation
+    '''
+    alf=[]
+    for s,y in reversed(pairs):
+        a=s.dot(q)/y.dot(s)
+        q=q-a*y
+        alf.append(a)
+    q=h0(q)
+    for (s,y),a in zip(pairs,reversed(alf)):
+        b=y.dot(q)/y.dot(s)
+        q=q+(a-b)*s
+    return q
+
+
+def lbfgs(fun,jac,x0,precond=None,m=10,gtol=1.e-05,ftol=2.2e-09,maxiter=1000):
+    '''
+    Limited-memory BFGS minimiser with an optional limited-memory preconditioner
+     Entries:
+     fun, jac : cost function and its gradient
+     x0 : first guess
+     precond : list of curvature pairs (s,y) from a previous minimisation;
+               their inverse Hessian approximation replaces the scalar
+               initial matrix of the L-BFGS recursion
+     m : number of pairs of the current minimisation kept in memory
+     gtol : stop when max(abs(gradient)) is below gtol
+     ftol : stop when the relative reduction of the cost over an iteration,
+            (f_k - f_k+1)/max(|f_k|,|f_k+1|,1), is below ftol (as L-BFGS-B)
+     maxiter : maximum number of iterations
+     Returns x, pairs (all the curvature pairs accepted), info (dictionary
+     with nit, nfev, ngev, fun, success and message: gtol or ftol reached,
+     line search failure or maxiter reached)
+    '''
+    neval=[0,0]
+    def f(x):
+        neval[0]+=1
+        return fun(x)
+    def g(x):
+        neval[1]+=1
+        return jac(x)
+
+    if precond:
+        s,y=precond[-1]
+        gam=s.dot(y)/y.dot(y)
+        lmp=lambda q: twoloop(q,precond,lambda r: gam*r)
+
+    x=np.array(x0,dtype=float)
+    fx=f(x)
+    gx=g(x)
+    fold=None
+    pairs=[]
+    allpairs=[]
+    nit=0
+    success,message=True,'gradient below gtol'
+    while np.max(np.abs(gx))>gtol:
+        if nit>=maxiter:
+            success,message=False,'maximum number of iterations reached'
+            break
+        if precond:
+            h0=lmp
+        elif pairs:
+            s,y=pairs[-1]
+            h0=lambda q,gam=s.dot(y)/y.dot(y): gam*q
+        else:
+            h0=lambda q,gnorm=np.sqrt(gx.dot(gx)): q/gnorm # first step of unit length
+        d=-twoloop(gx.copy(),pairs,h0)
+
+        step,_,_,fnew,fold,gnew=opt.line_search(f,g,x,d,gfk=gx,old_fval=fx,old_old_fval=fold)
+        if step is None:
+            success,message=False,'line search failed'
+            break
+        if gnew is None:
+            gnew=g(x+step*d)
+
+        s=step*d
+        y=gnew-gx
+        if s.dot(y)>0.:
+            pairs.append((s,y))
+            pairs=pairs[-m:]
+            allpairs.append((s,y))
+        x=x+s
+        fprev=fx
+        fx=fnew
+        gx=gnew
+        nit+=1
+        if fprev-fx<=ftol*max(abs(fprev),abs(fx),1.):
+            message='relative reduction of the cost below ftol'
+            break
+
+    info={'nit':nit,'nfev':neval[0],'ngev':neval[1],'fun':fx,
+          'success':success,'message':message}
+    return x, allpairs, info
+
+
+class Cycle:
+
+    def __init__(self,M,B,R,nt,precond=True,reuse=True,mpre=20,m=10,gtol=1.e-05,
+                 ftol=2.2e-09,maxiter=1000,Bcycle=None):
+        '''
+        Cycled strong-constraint 4D-Var
+         Entries:
+         M : model
+         B : background error covariance of the first window (gausscov)
+         R : observation error covariance
+         nt : number of time steps per window
+         precond : preconditioning by square root of B
+         reuse : precondition each minimisation with the curvature pairs
+                 of the previous window; they are only carried over between
+                 windows with the same background error covariance (the
+                 same control space)
+         mpre : number of pairs kept in the preconditioner (each costs
+                two dot products and two vector updates per iteration)
+         m, gtol, ftol, maxiter : L-BFGS parameters (see lbfgs)
+         Bcycle : background error covariance of the cycled windows, whose
+                  background is the forecast of the previous analysis (B if
+                  None). It should describe the forecast error once the
+                  cycle has settled, analysis error propagated over a window
+                  plus model error: a covariance larger than the actual
+                  background error lets the analysis fit the observation
+                  noise and degrade the background
+        '''
+        self.M=M
+        self.B=B
+        self.R=R
+        self.nt=nt
+        self.prec=precond
+        self.reuse=reuse
+        self.mpre=mpre
+        self.m=m
+        self.gtol=gtol
+        self.ftol=ftol
+        self.maxiter=maxiter
+        self.Bcycle=B if Bcycle is None else Bcycle
+
+    def ctl2state(self,B,ub,v):
+        if self.prec:
+            return ub + B.sqr.dot(v)
+        else:
+            return ub + v
+
+    def run(self,ub,windows):
+        '''
+        Assimilate successive windows
+         Entries:
+         ub : background state at the beginning of the first window
+         windows : list of observation operators (Obsopt with yo filled),
+                   one per window
+         Returns analyses (initial state of each window), backgrounds and
+         per-window statistics (nit, nfev, ngev, fun, success, message, time)
+        '''
+        pairs=None
+        B=self.B
+        ana=[]
+        bkg=[]
+        stats=[]
+        for H in windows:
+            bkg.append(ub)
+            var=Variational(ub,self.nt,B,self.M,H,self.R,self.prec)
+
+            tic=time.perf_counter()
+            # first guess is the forecast from the previous analysis (v=0)
+            v,newpairs,info=lbfgs(var.cost,var.grad,np.zeros(self.M.nx),
+                                  pairs,self.m,self.gtol,self.ftol,self.maxiter)
+            info['time']=time.perf_counter()-tic
+            stats.append(info)
+
+            ua=self.ctl2state(B,ub,v)
+            ana.append(ua)
+            # the analysis, propagated to the end of the window,
+            # becomes the background of the next one
+            ub=ua
+            for it in range(self.nt):
+                ub=self.M.step(ub)
+
+            Bprev,B=B,self.Bcycle
+            if not self.reuse or B is not Bprev:
+                pairs=None
+            elif newpairs:
+                pairs=newpairs[-self.mpre:]
+
+        return ana, bkg, stats
@@ -0,0 +1,128 @@
+import numpy as np
+import scipy.linalg as lin
+import scipy.sparse.linalg as spl
+
+
+class diffcov:
+
+    def __init__(self,x,sigma,L,m=10,nrand=None,block=256):
+        '''
+        Background error covariance operator modelled by m steps of an
+        implicit diffusion equation (Weaver and Courtier), on a grid that
+        needs neither be periodic nor regular, with Neumann boundaries:
+          B = U U^T,  U = sigma G (W^{-1} M)^{-m/2} W^{-1/2}
+        with M = W + kappa K (W lumped mass, i.e. cell widths, K stiffness
+        of the grid, tridiagonal), kappa = L^2/(2m) so that the correlations
+        tend to a gaussian of length L for large m, and G the diagonal
+        normalisation giving variances sigma^2.
+        Each product costs m/2 tridiagonal solves, O(nx), and no nx x nx
+        matrix is ever built.
+        Entries:
+        x : number of grid points nx (abscissae i/nx) or grid abscissae
+        sigma : error std
+        L : correlation length (same unit as x)
+        m : number of diffusion steps (even)
+        nrand : normalisation estimated from nrand random vectors, exact
+                (nx products, O(nx^2)) if None
+        block : number of vectors per product for the normalisation
+        Attributes:
+        sqr : U as a LinearOperator, the square root of B for the
+              preconditioned Variational
+        mat : B as a LinearOperator
+        inv : B^{-1} as a LinearOperator (no solve, M is applied directly)
+        '''
+        if np.ndim(x)==0:
+            x=np.arange(x)/float(x)
+        x=np.asarray(x,dtype=float)
+        if m%2:
+            raise ValueError('the number of diffusion steps m must be even')
+        nx=x.size
+        h=np.diff(x)
+        if np.any(h<=0.):
+            raise ValueError('grid abscissae must be increasing')
+        self.nx=nx
+        self.m=m
+        self.sigma=sigma
+        self.kappa=L*L/(2.*m)
+
+        # cell widths (lumped mass) and tridiagonal stiffness, both boundary
+        # cells being halved (Neumann condition)
+        self.w=np.zeros(nx)
+        self.w[:-1]+=0.5*h
+        self.w[1:]+=0.5*h
+        diag=np.zeros(nx)
+        diag[:-1]+=1./h
+        diag[1:]+=1./h
+        self.mdiag=self.w+self.kappa*diag
+        self.moff=-self.kappa/h
+        ab=np.zeros((2,nx)) # upper band storage of M
+        ab[0,1:]=self.moff
+        ab[1]=self.mdiag
+        self.chol=lin.cholesky_banded(ab)
+
+        # normalisation: G = diag(U0 U0^T)^{-1/2} with U0 the unnormalised U,
+        # randomised estimate of the diagonal mean((U0 z)^2) with z ~ N(0,I)
+        self.gamma=np.ones(nx)
+        d=np.zeros(nx)
+        if nrand is None:
+            for i0 in range(0,nx,block):
+                e=np.zeros((nx,min(block,nx-i0)))
+                e[i0+np.arange(e.shape[1]),np.arange(e.shape[1])]=1.
+                d+=np.sum(self._sqr(e)**2,axis=1)
+        else:
+            for i0 in range(0,nrand,block):
+                z=np.random.normal(0.,1.,(nx,min(block,nrand-i0)))
+                d+=np.sum(self._sqr(z)**2,axis=1)
+            d/=nrand
+        self.gamma=sigma/np.sqrt(d) # d includes the factor sigma^2 of U
+
+        self.sqr=spl.LinearOperator((nx,nx),matvec=self._sqr,rmatvec=self._sqr_t,
+                                    matmat=self._sqr,rmatmat=self._sqr_t,dtype=float)
+        self.mat=spl.LinearOperator((nx,nx),matvec=self._mat,rmatvec=self._mat,
+                                    matmat=self._mat,rmatmat=self._mat,dtype=float)
+        self.inv=spl.LinearOperator((nx,nx),matvec=self._inv,rmatvec=self._inv,
+                                    matmat=self._inv,rmatmat=self._inv,dtype=float)
+
+    def _col(self,a,v):
+        # diagonal a applied to a vector or to the columns of an array
+        return a[:,None]*v if v.ndim==2 else a*v
+
+    def _mdot(self,v):
+        ''' M v, tridiagonal product '''
+        y=self._col(self.mdiag,v)
+        y[:-1]+=self._col(self.moff,v[1:])
+        y[1:]+=self._col(self.moff,v[:-1])
+        return y
+
+    def _diffuse(self,v):
+        ''' m/2 implicit diffusion steps (W^{-1} M)^{-m/2} v '''
+        for k in range(self.m//2):
+            v=lin.cho_solve_banded((self.chol,False),self._col(self.w,v))
+        return v
+
+    def _diffuse_t(self,v):
+        ''' adjoint of _diffuse, (W M^{-1})^{m/2} v '''
+        for k in range(self.m//2):
+            v=self._col(self.w,lin.cho_solve_banded((self.chol,False),v))
+        return v
+
+    def _sqr(self,v):
+        v=np.asarray(v,dtype=float)
+        return self.sigma*self._col(self.gamma,self._diffuse(self._col(1./np.sqrt(self.w),v)))
+
+    def _sqr_t(self,v):
+        v=np.asarray(v,dtype=float)
+        return self.sigma*self._col(1./np.sqrt(self.w),self._diffuse_t(self._col(self.gamma,v)))
+
+    def _mat(self,v):
+        return self._sqr(self._sqr_t(v))
+
+    def _inv(self,v):
+        # U^{-1} = W^{1/2} (W^{-1} M)^{m/2} G^{-1} / sigma, and its transpose
+        v=self._col(1./self.gamma,np.asarray(v,dtype=float))/self.sigma
+        for k in range(self.m//2):
+            v=self._col(1./self.w,self._mdot(v))
+        v=self._col(self.w,v) # W^{1/2} of U^{-1} then of U^{-T}
+        for k in range(self.m//2):
+            v=self._mdot(self._col(1./self.w,v))
+        return self._col(1./self.gamma,v)/self.sigma
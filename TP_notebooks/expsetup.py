@@ -0,0 +1,142 @@
+import os
+import json
+import shutil
+import hashlib
+import math
+import numpy as np
+try:
+    from .burgers import Burgers
+    from .gausscov import gausscov
+    from .obsopt import Obsopt
+except ImportError: # run as a script from TP_notebooks
+    from burgers import Burgers
+    from gausscov import gausscov
+    from obsopt import Obsopt
+
+CACHEDIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),'.cache')
+MAXSIZE = 512*1024*1024   # bytes kept in the cache before eviction
+VERSION = 1               # to be increased when the generated artifacts change
+
+
+class cachedcov:
+    ''' Covariance matrix read from the cache, with the attributes of gausscov '''
+    def __init__(self,**arrays):
+        for name,arr in arrays.items():
+            setattr(self,name,arr)
+
+
+def _key(config,arrays):
+    h=hashlib.sha1(json.dumps(config,sort_keys=True).encode())
+    for name in sorted(arrays):
+        h.update(name.encode())
+        h.update(np.ascontiguousarray(arrays[name],dtype=float).tobytes())
+    return h.hexdigest()[:20]
+
+def _size(path):
+    return sum(os.path.getsize(os.path.join(path,f)) for f in os.listdir(path))
+
+def _evict(cachedir,maxsize,keep):
+    ''' Remove least recently used entries until the cache fits in maxsize '''
+    entries=[ os.path.join(cachedir,d) for d in os.listdir(cachedir)
+              if not d.startswith('.') ]
+    entries.sort(key=os.path.getmtime)
+    total=sum(_size(e) for e in entries)
+    for e in entries:
+        if total<=maxsize:
+            break
+        if os.path.basename(e)==keep:
+            continue
+        total-=_size(e)
+        shutil.rmtree(e,ignore_errors=True)
+
+def cached(config,build,cachedir=CACHEDIR,maxsize=MAXSIZE,arrays={}):
+    '''
+    Artifacts keyed by a hash of the configuration
+     Entries:
+     config : dictionary of parameters (json-serialisable)
+     build : function returning a dictionary of numpy arrays, called on a cache miss
+     arrays : additional array parameters entering the key
+     Returns the dictionary of arrays, memory-mapped copy-on-write
+     (modifications stay private to the process)
+    '''
+    config=dict(config,version=VERSION)
+    path=os.path.join(cachedir,_key(config,arrays))
+    if not os.path.isdir(path):
+        out=build()
+        tmp=os.path.join(cachedir,'.tmp-%d'%os.getpid())
+        os.makedirs(tmp,exist_ok=True)
+        for name,arr in out.items():
+            np.save(os.path.join(tmp,name+'.npy'),arr)
+        with open(os.path.join(tmp,'config.json'),'w') as f:
+            json.dump(config,f,sort_keys=True)
+        try:
+            os.rename(tmp,path)
+        except OSError: # written concurrently by another process
+            shutil.rmtree(tmp,ignore_errors=True)
+        _evict(cachedir,maxsize,os.path.basename(path))
+    else:
+        os.utime(path) # for least recently used eviction
+
+    return { f[:-4] : np.load(os.path.join(path,f),mmap_mode='c')
+             for f in os.listdir(path) if f.endswith('.npy') }
+
+
+def cov(nx,sigma,L,indic,**kwargs):
+    '''
+    gausscov(nx,sigma,L,indic) through the cache
+    '''
+    names={1:'inv',2:'sqr',3:'ext'}
+    def build():
+        B=gausscov(nx,sigma,L,indic)
+        return {'mat':B.mat, names[indic]:getattr(B,names[indic])}
+    config={'what':'gausscov','nx':nx,'sigma':sigma,'L':L,'indic':indic}
+    return cachedcov(**cached(config,build,**kwargs))
+
+
+def setup(nx=40,dt=None,nt=20,ns=0,sigmab=0.02,sigmao=0.001,Lb=0.05,
+          iobsxsub=8,iobstsub=5,indic=2,seed=0,uo=None,ub=None,**kwargs):
+    '''
+    Burgers twin experiment set up through the cache
+     Entries:
+     nx, dt, nt, ns : model parameters (dt=0.5*dx by default)
+     sigmab, sigmao, Lb : error statistics
+     iobsxsub, iobstsub : spatial and temporal subsampling of observations
+     indic : factorisation of B (see gausscov)
+     seed : seed of the observation noise
+     uo, ub : true and background initial states (sin and cos by default)
+     cachedir, maxsize : cache location and size
+     Returns M, H (with its observations yo), B, true and background trajectories
+     (lists of nt+1 states)
+    '''
+    dx=1./nx
+    if dt is None:
+        dt=0.5*dx
+    xx=np.array(range(nx))*dx
+    if uo is None:
+        uo=np.sin(2*math.pi*xx)
+    if ub is None:
+        ub=np.cos(2*math.pi*xx)
+
+    M=Burgers(nx,dx,dt,ns)
+    H=Obsopt(nx,iobsxsub,nt,iobstsub)
+    B=cov(nx,sigmab,Lb,indic,**kwargs)
+
+    def build():
+        np.random.seed(seed)
+        true=H.gen_obs(M,uo,sigmao)
+        ubkg=[ub]
+        u=ub
+        for it in range(nt):
+            u=M.step(u)
+            ubkg.append(u)
+        times=sorted(H.yo)
+        return {'true':np.array(true),'ubkg':np.array(ubkg),
+                'tobs':np.array(times),'yo':np.array([H.yo[t] for t in times])}
+    config={'what':'burgers','nx':nx,'dt':dt,'nt':nt,'ns':ns,'sigmao':sigmao,
+            'iobsxsub':iobsxsub,'iobstsub':iobstsub,'seed':seed}
+    out=cached(config,build,arrays={'uo':uo,'ub':ub},**kwargs)
+    H.yo={ int(t):yo for t,yo in zip(out['tobs'],out['yo']) }
+
+    # lists of states, as built by gen_obs (plots.anim tells a single
+    # trajectory from several by the type of its first element)
+    return M, H, B, [ np.asarray(u) for u in out['true'] ], [ np.asarray(u) for u in out['ubkg'] ]
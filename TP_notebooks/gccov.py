@@ -0,0 +1,156 @@
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spl
+import scipy.linalg as lin
+import scipy.linalg.lapack as lapack
+
+
+def gaspari_cohn(r):
+    '''
+    Gaspari-Cohn compactly supported correlation function of r = distance/c,
+    zero for r >= 2
+    '''
+    ra=np.abs(np.asarray(r,dtype=float))
+    gp=np.zeros_like(ra)
+    i=ra<=1.
+    gp[i]=-0.25*ra[i]**5+0.5*ra[i]**4+0.625*ra[i]**3-5./3.*ra[i]**2+1.
+    i=(ra>1.)*(ra<2.)
+    gp[i]=1./12.*ra[i]**5-0.5*ra[i]**4+0.625*ra[i]**3+5./3.*ra[i]**2-5.*ra[i]+4.-2./3./ra[i]
+    return gp
+
+
+class gccov:
+
+    def __init__(self,nx,sigma,L,indic=None):
+        '''
+        Background error covariance matrix with Gaspari-Cohn correlations on
+        the periodic grid, stored sparse and factored by a sparse Cholesky
+        decomposition B = C C^T, banded except for the periodic border
+        Entries:
+        nx : number of grid points
+        sigma : error std
+        L : correlation length, with the meaning of gausscov (the support
+            of the correlations is 2*sqrt(10/3)*L)
+        indic : kept for compatibility with gausscov, mat, sqr and inv
+                are all provided
+        Attributes:
+        mat : B as a sparse matrix
+        sqr : the Cholesky factor C as a LinearOperator (B = C C^T, C being
+              a non-symmetric square root)
+        inv : B^{-1} as a LinearOperator (banded triangular solves)
+        '''
+        dx=1./nx
+        c=np.sqrt(10./3.)*L
+        # chord distance on the periodic domain of length 1, which keeps the
+        # Gaspari-Cohn correlations positive definite: zero beyond the
+        # distance k*dx of chord 2c
+        if 2.*np.pi*c<1.:
+            nband=min(int(np.ceil(np.arcsin(2.*np.pi*c)/np.pi/dx)),nx//2)
+        else:
+            nband=nx//2
+        self.nband=nband
+        k=np.arange(nband+1)
+        rho=gaspari_cohn(np.sin(np.pi*k*dx)/np.pi/c)
+        self.diag=sigma*sigma*rho # constant diagonals of the band
+
+        rows=[]
+        cols=[]
+        vals=[]
+        i=np.arange(nx)
+        for kk in range(-nband,nband+1):
+            if abs(kk)==nx-abs(kk): # same diagonal reached both ways
+                if kk<0:
+                    continue
+            rows.append(i)
+            cols.append((i+kk)%nx)
+            vals.append(np.full(nx,self.diag[abs(kk)]))
+        self.mat=sp.csc_matrix((np.concatenate(vals),
+                                (np.concatenate(rows),np.concatenate(cols))),
+                               shape=(nx,nx))
+
+        self.factor()
+
+    def factor(self):
+        # Periodic band matrix, split as [[A11, A12], [A21, A22]] with A11
+        # banded of order nx-nband and A22 of order nband. Cholesky factor
+        #   C = [[C11, 0], [C21, C22]]
+        # with C11 from the banded Cholesky of A11, C21 = A21 C11^{-T}
+        # (nband x nx-nband) and C22 the Cholesky factor of A22 - C21 C21^T:
+        # storage O(nx*nband), factorisation O(nx*nband^2)
+        A=self.mat.tocsr()
+        nx=A.shape[0]
+        b=self.nband
+        m=nx-b
+        ab=np.zeros((b+1,m)) # lower band storage of A11
+        for k in range(b+1):
+            ab[k,:m-k]=self.diag[k]
+        self.c11=lin.cholesky_banded(ab,lower=True)
+        self.c21=self._solve_border(A[:m,m:].toarray()).T
+        self.c22=lin.cholesky(A[m:,m:].toarray()-np.dot(self.c21,self.c21.T),lower=True)
+
+        self.sqr=spl.LinearOperator((nx,nx),matvec=self._sqr,rmatvec=self._sqr_t,
+                                    matmat=self._sqr,rmatmat=self._sqr_t,dtype=float)
+        self.inv=spl.LinearOperator((nx,nx),matvec=self._inv,rmatvec=self._inv,
+                                    matmat=self._inv,rmatmat=self._inv,dtype=float)
+
+    def _solve_border(self,x):
+        '''
+        C11^{-1} A12: the rows of A12 wrapping around the periodic border
+        give a solution that decays along the band. It is computed on the
+        leading rows only, until negligible, instead of being carried down
+        to underflow (subnormal numbers make the solve an order of
+        magnitude slower)
+        '''
+        m,b=x.shape
+        p=min(m,8*b)
+        while True:
+            top,info=lapack.dtbtrs(self.c11[:,:p],x[:p],uplo='L')
+            if p==m:
+                return top
+            if np.abs(top[p-b:]).max()<=1e-20*np.abs(top).max():
+                break
+            p=min(m,2*p)
+        y=np.zeros((m,b))
+        y[:p]=top
+        y[p:],info=lapack.dtbtrs(self.c11[:,p:],x[p:],uplo='L')
+        return y
+
+    def _mul11(self,x,trans=False):
+        ''' C11 x (or C11^T x) from the band storage '''
+        m=x.shape[0]
+        y=self.c11[0,:,None]*x.reshape(m,-1)
+        x2=x.reshape(m,-1)
+        for k in range(1,self.c11.shape[0]):
+            if trans:
+                y[:m-k]+=self.c11[k,:m-k,None]*x2[k:]
+            else:
+                y[k:]+=self.c11[k,:m-k,None]*x2[:m-k]
+        return y.reshape(x.shape)
+
+    def _solve11(self,x,trans=False):
+        ''' C11^{-1} x (or C11^{-T} x), banded triangular solve '''
+        m=x.shape[0]
+        y,info=lapack.dtbtrs(self.c11,x.reshape(m,-1),uplo='L',
+                             trans='T' if trans else 'N')
+        return y.reshape(x.shape)
+
+    def _sqr(self,v):
+        m=self.c11.shape[1]
+        v1,v2=v[:m],v[m:]
+        return np.concatenate((self._mul11(v1),
+                               np.dot(self.c21,v1)+np.dot(self.c22,v2)))
+
+    def _sqr_t(self,v):
+        m=self.c11.shape[1]
+        v1,v2=v[:m],v[m:]
+        return np.concatenate((self._mul11(v1,True)+np.dot(self.c21.T,v2),
+                               np.dot(self.c22.T,v2)))
+
+    def _inv(self,v):
+        # forward then backward substitution with C
+        m=self.c11.shape[1]
+        y1=self._solve11(v[:m])
+        y2=lin.solve_triangular(self.c22,v[m:]-np.dot(self.c21,y1),lower=True)
+        x2=lin.solve_triangular(self.c22,y2,lower=True,trans='T')
+        x1=self._solve11(y1-np.dot(self.c21.T,x2),True)
+        return np.concatenate((x1,x2))
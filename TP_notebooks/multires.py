@@ -0,0 +1,183 @@
+import time
+import numpy as np
+import scipy.optimize as opt
+try:
+    from . import obscov
+    from .burgers import Burgers
+    from .gausscov import gausscov
+    from .obsopt import Obsopt
+    from .simvar import Variational
+    from .transfer import Transfer
+except ImportError: # run as a script from TP_notebooks
+    import obscov
+    from burgers import Burgers
+    from gausscov import gausscov
+    from obsopt import Obsopt
+    from simvar import Variational
+    from transfer import Transfer
+
+
+class CoarseObs(Obsopt):
+
+    def __init__(self,H,transfer):
+        '''
+        Observation operator of an Obsopt seen from a coarse grid, whose
+        time step is also coarsened by transfer.r: the prolongation
+        followed by the fine observation operator
+        Entries:
+        H : fine Obsopt
+        transfer : Transfer between the fine and the coarse grids
+        The observation vectors yo are set by the outer loop
+        '''
+        self.nx = transfer.nc
+        self.nt = H.nt//transfer.r
+        self.tsub = H.tsub//transfer.r
+        self.xsub = H.xsub
+        self.yo={}
+        self.nobs = H.nobs
+        self.mat = transfer.mat.T.dot(H.mat.T).T # H P, dense (nobs,nc)
+
+
+class InnerVariational(Variational):
+
+    def __init__(self,ubkg,nt,B,M,H,R,vg):
+        '''
+        Inner loop cost on a coarse grid, preconditioned by B^{1/2}:
+        the control is the increment dv to the current guess, of control
+        vg, so the background term is |vg+dv|^2
+        Entries:
+        ubkg : current guess restricted to the coarse grid
+        vg : control of the current guess, (B^{1/2})^{-1} S (u - ub)
+        other entries : see Variational, on the coarse grid
+        '''
+        Variational.__init__(self,ubkg,nt,B,M,H,R,True)
+        self.vg=vg
+
+    def ctl2state(self,v):
+        u  = self.B.sqr.dot(v) + self.ubkg
+        gb = self.vg + v
+        Jb = gb.dot(gb)
+        return u, gb, Jb
+
+
+class MultiResVariational:
+
+    def __init__(self,ubkg,nt,M,H,R,sigmab,Lb,levels=(4,2),maxiter=30,gtol=1.e-05):
+        '''
+        Multi-resolution incremental 4D-Var. Each outer loop runs the fine
+        Burgers model from the current guess and computes the innovations;
+        the inner loop minimises on a grid coarsened by a factor r, with a
+        coarse Burgers model (time step also coarsened by r, which keeps
+        the Courant number and the Lax-Friedrichs diffusion close to the
+        fine ones), gausscov and observation operator, and the increment
+        is prolonged to the fine grid.
+        Entries:
+        ubkg : fine background initial state
+        nt : number of time steps of the window
+        M : fine Burgers model
+        H : fine Obsopt with its observations yo
+        R : observation error covariance matrix (see obscov)
+        sigmab, Lb : background error std and correlation length
+        levels : coarsening factor of each outer loop (1 for the fine grid),
+                 dividing nt, the observation period and nx; of two
+                 consecutive levels, one divides the other
+        maxiter, gtol : L-BFGS-B parameters of the inner minimisations
+        '''
+        self.ubkg=ubkg
+        self.nt=nt
+        self.M=M
+        self.H=H
+        self.R=R
+        self.Rinv=obscov.inverse(R)
+        self.levels=list(levels)
+        self.maxiter=maxiter
+        self.gtol=gtol
+        nx=M.nx
+        dx=1./nx
+        dt=M.cfl*dx
+        for r0,r1 in zip(self.levels[:-1],self.levels[1:]):
+            if r0%r1!=0 and r1%r0!=0:
+                raise ValueError('consecutive coarsening factors must divide one another')
+        self.grids={}
+        for r in set(self.levels):
+            if nt%r!=0 or H.tsub%r!=0:
+                raise ValueError('the coarsening factor must divide nt and the observation period')
+            transfer=Transfer(nx,r)
+            self.grids[r]={'transfer':transfer,
+                           'M':Burgers(transfer.nc,r*dx,r*dt,M.ns),
+                           'B':gausscov(transfer.nc,sigmab,Lb,2),
+                           'H':CoarseObs(H,transfer)}
+            B=self.grids[r]['B']
+            B.sqr=np.real(B.sqr)
+
+    def transfer_ctl(self,v,r0,r1):
+        '''
+        Control vector of an increment moved from the grid coarsened by r0
+        to that coarsened by r1, interpolated (or restricted) in control
+        space and scaled by sqrt(r1/r0): B^{1/2} v then represents the same
+        increment on both grids, with the same norm |v|^2, i.e. the same Jb
+        '''
+        if r0==r1:
+            return v
+        if r0%r1==0:
+            return Transfer(self.M.nx//r1,r0//r1).prolong(v)*np.sqrt(r1/r0)
+        return Transfer(self.M.nx//r0,r1//r0).restrict(v)*np.sqrt(r1/r0)
+
+    def trajectory(self,model,u,nt):
+        ''' Nonlinear trajectory as a (nt+1,nx) array '''
+        trj=np.empty((nt+1,model.nx))
+        for it in range(nt):
+            trj[it]=u
+            u=model.step(u)
+        trj[nt]=u
+        return trj
+
+    def run(self):
+        '''
+        Outer loops
+         Returns the fine analysis and, per outer loop, a dict of the
+         coarsening factor r, the inner iterations nit, the fine Jo of the
+         guess and the elapsed time
+        '''
+        stats=[]
+        rprev=None
+        vg=None
+        for r in self.levels:
+            tic=time.perf_counter()
+            g=self.grids[r]
+            S=g['transfer']
+
+            # control of the guess, carried over in control space when the
+            # resolution changes, and guess rebuilt from it, so that the
+            # inner background term |vg+dv|^2 is that of the actual increment
+            if vg is None:
+                vg=np.zeros(S.nc)
+            else:
+                vg=self.transfer_ctl(vg,rprev,r)
+            u=self.ubkg + S.prolong(g['B'].sqr.dot(vg))
+
+            # fine nonlinear trajectory and innovations
+            trj=self.trajectory(self.M,u,self.nt)
+            Jo=self.H.misfit_all(trj,self.Rinv)[0]
+
+            # coarse reference trajectory: the coarse observations are the
+            # innovations plus the coarse equivalent of the reference, so
+            # that the inner misfits are H P (x - xref) - (yo - H u)
+            uc=S.restrict(u)
+            Hc=g['H']
+            trjc=self.trajectory(g['M'],uc,Hc.nt)
+            for t in self.H.yo:
+                Hc.yo[t//r]=(self.H.yo[t] - self.H.dir(t,trj[t])) + Hc.dir(t//r,trjc[t//r])
+
+            var=InnerVariational(uc,Hc.nt,g['B'],g['M'],Hc,self.R,vg)
+            res=opt.minimize(var.cost,np.zeros(S.nc),
+                             method='L-BFGS-B',
+                             jac=var.grad,
+                             options={'gtol': self.gtol, 'maxiter': self.maxiter})
+
+            vg=vg + res['x']
+            rprev=r
+            stats.append({'r':r,'nit':res['nit'],'Jo':Jo,
+                          'time':time.perf_counter()-tic})
+        u=self.ubkg + S.prolong(g['B'].sqr.dot(vg))
+        return u, stats
@@ -0,0 +1,53 @@
+'''
+Observation error covariance matrices R, given either as
+ - a 2D array (dense matrix),
+ - a 1D array of variances (diagonal matrix),
+ - a list of 2D arrays (block diagonal matrix, blocks of consecutive
+   observations)
+'''
+
+import numpy as np
+from scipy.linalg import inv
+
+def inverse(R):
+    ''' R^{-1}, in the same representation as R '''
+    if isinstance(R,(list,tuple)):
+        return [ inv(Rk) for Rk in R ]
+    R=np.asarray(R)
+    if R.ndim==1:
+        return 1./R
+    return inv(R)
+
+def apply(Rinv,d):
+    '''
+    Product of a (symmetric) matrix in one of the above representations with
+    d, along its last axis (d may stack several misfit vectors)
+    '''
+    if isinstance(Rinv,(list,tuple)):
+        out=np.empty(np.shape(d))
+        i0=0
+        for Rk in Rinv:
+            i1=i0+Rk.shape[0]
+            out[...,i0:i1]=np.dot(d[...,i0:i1],Rk)
+            i0=i1
+        return out
+    if Rinv.ndim==1:
+        return Rinv*d
+    return np.dot(d,Rinv)
+
+def blocks(R):
+    '''
+    Independent blocks of R: list of (first, last+1 observation index, block),
+    blocks of diagonal matrices being scalar variances
+    '''
+    if isinstance(R,(list,tuple)):
+        out=[]
+        i0=0
+        for Rk in R:
+            out.append((i0,i0+Rk.shape[0],Rk))
+            i0=i0+Rk.shape[0]
+        return out
+    R=np.asarray(R)
+    if R.ndim==1:
+        return [ (i,i+1,R[i]) for i in range(R.size) ]
+    return [ (0,R.shape[0],R) ]
@@ -0,0 +1,167 @@
+import os
+import glob
+import queue
+import asyncio
+import threading
+import numpy as np
+
+
+def write_obs(path,H,t0=0,compress=False):
+    '''
+    Write the observations of an ObsNetwork to a .npz chunk file
+     Entries:
+     path : file name
+     H : ObsNetwork with its observations yo
+     t0 : time step of the beginning of the window (times are stored absolute)
+     compress : use np.savez_compressed
+    '''
+    times=[ t for t in H.times() if t in H.yo ]
+    t=np.concatenate([ np.full(H.yo[s].size,s+t0) for s in times ])
+    loc=np.concatenate([ H.loc[s] for s in times ])
+    yo=np.concatenate([ H.yo[s] for s in times ])
+    var=np.concatenate([ H.var[s] for s in times ])
+    save=np.savez_compressed if compress else np.savez
+    save(path,t=t,loc=loc,yo=yo,var=var)
+
+def read_chunk(path):
+    ''' Observations of one chunk file: arrays t, loc, yo and var '''
+    with np.load(path) as f:
+        return { k:f[k] for k in ('t','loc','yo','var') }
+
+def batches(chunk):
+    '''
+    Split a chunk into one batch per observation time
+     Returns a list of (t, loc, yo, var), by increasing t
+    '''
+    t=chunk['t']
+    if np.any(np.diff(t)<0):
+        raise ValueError('observations of a chunk must be sorted by time')
+    cuts=np.flatnonzero(np.diff(t))+1
+    return [ (int(t[k[0]]),chunk['loc'][k],chunk['yo'][k],chunk['var'][k])
+             for k in np.split(np.arange(t.size),cuts) if k.size ]
+
+def _sequence(pending,b):
+    '''
+    Time ordering of the batches of consecutive chunks: a batch at the
+    same time as the last one of the previous chunk (the boundary time
+    shared by two windows, t=nt of a window and t=0 of the next one for
+    Obsopt) is merged with it
+     Returns the batch ready to be delivered (None if none) and the batch
+     kept pending
+    '''
+    if pending is None:
+        return None, b
+    if b[0]<pending[0]:
+        raise ValueError('chunks are not sorted by time')
+    if b[0]==pending[0]:
+        return None, (b[0],)+tuple(np.concatenate((p,q)) for p,q in zip(pending[1:],b[1:]))
+    return pending, b
+
+def chunk_files(pattern):
+    ''' Chunk files matching a glob pattern (or in a directory), sorted by name '''
+    if os.path.isdir(pattern):
+        pattern=os.path.join(pattern,'*.npz')
+    return sorted(glob.glob(pattern))
+
+
+class ObsReader:
+
+    def __init__(self,paths,readahead=2):
+        '''
+        Time-sorted observation batches streamed from chunk files, read by a
+        background thread at most readahead chunks ahead of the consumer
+        (plus the one being read). Observations of the same time in two
+        consecutive chunks are delivered as one batch
+        Entries:
+        paths : list of chunk files, in time order
+        readahead : number of chunks held in memory ahead of the consumer
+        Usage:
+        for t, loc, yo, var in ObsReader(paths): ...
+        '''
+        self.paths=list(paths)
+        self.readahead=readahead
+
+    def _produce(self,q,stop):
+        try:
+            for path in self.paths:
+                chunk=read_chunk(path)
+                while not stop.is_set():
+                    try:
+                        q.put(chunk,timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+            q.put(None)
+        except Exception as e:
+            q.put(e)
+
+    def __iter__(self):
+        q=queue.Queue(self.readahead)
+        stop=threading.Event()
+        th=threading.Thread(target=self._produce,args=(q,stop),daemon=True)
+        th.start()
+        pending=None
+        try:
+            while True:
+                chunk=q.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk,Exception):
+                    raise chunk
+                for b in batches(chunk):
+                    ready,pending=_sequence(pending,b)
+                    if ready is not None:
+                        yield ready
+            if pending is not None:
+                yield pending
+        finally:
+            stop.set()
+
+
+async def astream(paths,readahead=2):
+    '''
+    Asynchronous version of ObsReader: the chunk files are read in a worker
+    thread while the consumer computes, at most readahead chunks ahead
+    (plus the one being read). The reads only progress while the consumer
+    leaves the event loop running: its computations should be awaited in
+    an executor (loop.run_in_executor); the stream also yields to the loop
+    after each batch, so that a consumer computing on the loop still gets
+    the next read started, one read being in flight at a time
+    Usage:
+    async for t, loc, yo, var in astream(paths): ...
+    '''
+    loop=asyncio.get_running_loop()
+    q=asyncio.Queue(readahead)
+
+    async def produce():
+        try:
+            for path in paths:
+                chunk=await loop.run_in_executor(None,read_chunk,path)
+                await q.put(chunk)
+            await q.put(None)
+        except Exception as e:
+            await q.put(e)
+
+    task=asyncio.ensure_future(produce())
+    pending=None
+    try:
+        while True:
+            chunk=await q.get()
+            if chunk is None:
+                break
+            if isinstance(chunk,Exception):
+                raise chunk
+            for b in batches(chunk):
+                ready,pending=_sequence(pending,b)
+                if ready is not None:
+                    yield ready
+                    # q.get() does not suspend on a non-empty queue: let the
+                    # producer start its next read
+                    await asyncio.sleep(0)
+        if pending is not None:
+            yield pending
+        await task
+    finally:
+        task.cancel()
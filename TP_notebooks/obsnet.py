@@ -0,0 +1,149 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def interp(nx,loc):
+    '''
+    Linear interpolation from a periodic grid of nx points (abscissa i/nx)
+    to arbitrary locations
+     Entries:
+     loc : observation abscissae in [0,1) (taken modulo 1)
+     Returns a sparse (nobs,nx) matrix with two weights per row
+    '''
+    loc=np.atleast_1d(np.asarray(loc,dtype=float))
+    p=np.mod(loc,1.)*nx
+    i0=np.floor(p).astype(int)%nx
+    w=p-np.floor(p)
+    rows=np.arange(loc.size)
+    return sp.csr_matrix((np.concatenate((1.-w,w)),
+                          (np.concatenate((rows,rows)),
+                           np.concatenate((i0,(i0+1)%nx)))),
+                         shape=(loc.size,nx))
+
+
+def network(H,sigmao):
+    '''
+    ObsNetwork equivalent to the Obsopt H and its observations yo
+     Entries:
+     sigmao : observation error std
+    '''
+    N=ObsNetwork(H.nx,H.nt)
+    loc=np.argmax(H.mat,axis=1)/H.nx
+    for t in sorted(H.yo):
+        N.add(t,loc,sigmao*sigmao,H.yo[t])
+    return N
+
+
+class ObsNetwork:
+
+    def __init__(self,nx,nt):
+        '''
+        Observations at arbitrary locations, with a network that may change
+        at each observation time and one error variance per observation
+        Entries:
+        nx : number of grid points
+        nt : number of time steps of the window
+        Observations are added time by time with add(); nobs is the total
+        number of observations
+        '''
+        self.nx=nx
+        self.nt=nt
+        self.loc={}      # observation abscissae
+        self.var={}      # observation error variances
+        self.mat={}      # interpolation weights (sparse)
+        self.yo={}       # observation vectors
+        self.nobs=0
+        self._batch=None
+
+    def add(self,t,loc,var,yo=None,mat=None):
+        '''
+        Set the network at time step t
+         Entries:
+         loc : observation abscissae
+         var : observation error variances (scalar or one per observation)
+         yo : observed values (may be generated later by gen_obs)
+         mat : sparse observation operator replacing the interpolation
+               to loc (e.g. averages for super-observations)
+        '''
+        if t in self.mat:
+            self.nobs-=self.mat[t].shape[0]
+        self.mat[t]=interp(self.nx,loc) if mat is None else sp.csr_matrix(mat)
+        n=self.mat[t].shape[0]
+        self.loc[t]=np.atleast_1d(np.asarray(loc,dtype=float))
+        self.var[t]=np.broadcast_to(np.asarray(var,dtype=float),(n,)).copy()
+        if yo is not None:
+            self.yo[t]=np.asarray(yo,dtype=float)
+        self.nobs+=n
+        self._batch=None
+
+    def times(self):
+        return sorted(self.mat)
+
+    def isobserved(self,t):
+        return t in self.mat
+
+    def gen_obs(self,model,u0,true=None):
+        if true is None: # true trajectory
+            true=[u0]
+            u=u0
+            for t in range(self.nt):
+                u = model.step(u)
+                true.append(u)
+
+        for t in self.times():
+            noise = np.random.normal(0.,1.,self.var[t].size)*np.sqrt(self.var[t])
+            self.yo[t] = self.mat[t].dot(true[t]) + noise
+        self._batch=None
+
+        return true
+
+    def dir(self,t,u):
+        if self.isobserved(t):
+            return self.mat[t].dot(u)
+
+    def tan(self,t,u):
+        if self.isobserved(t):
+            return self.mat[t].dot(u)
+
+    def adj(self,t,y):
+        if self.isobserved(t):
+            return self.mat[t].T.dot(y)
+
+    def misfit(self,t,u):
+        if self.isobserved(t):
+            return self.mat[t].dot(u) - self.yo[t]
+
+    def rinv(self,t):
+        ''' Inverse observation error variances at time t '''
+        return 1./self.var[t]
+
+    def batch(self):
+        '''
+        Observations of the whole window stacked: sparse operator acting on
+        the flattened (nt+1,nx) trajectory, observations and inverse variances
+        '''
+        if self._batch is None:
+            times=self.times()
+            blocks=[]
+            for t in times:
+                Ht=self.mat[t].tocoo()
+                blocks.append(sp.csr_matrix((Ht.data,(Ht.row,Ht.col+t*self.nx)),
+                                            shape=(Ht.shape[0],(self.nt+1)*self.nx)))
+            self._batch=(sp.vstack(blocks).tocsr(),
+                         np.concatenate([self.yo[t] for t in times]),
+                         np.concatenate([1./self.var[t] for t in times]))
+        return self._batch
+
+    def misfit_all(self,traj,Rinv=None):
+        '''
+        Misfits of the whole window in one batched operation
+         Entries:
+         traj : trajectory stacked as a (nt+1,nx) array
+         Rinv : unused, the variances of the network are used
+         Returns Jo = sum d^T R^{-1} d and the adjoint forcing H^T R^{-1} d
+         at every time step as a (nt+1,nx) array
+        '''
+        Hall,yall,rinv=self.batch()
+        d=Hall.dot(np.ravel(traj)) - yall
+        w=rinv*d
+        return d.dot(w), Hall.T.dot(w).reshape(self.nt+1,self.nx)
@@ -1,4 +1,8 @@
 import numpy as np
+try:
+    from . import obscov
+except ImportError: # run as a script from TP_notebooks
+    import obscov
 
 class Obsopt:
 
@@ -22,19 +26,18 @@ class Obsopt:
     def isobserved(self,t):
         return t%self.tsub==0
         
-    def gen_obs(self,model,u0,sigmao):
-        true=[u0] # true trajectory
-        u=u0
-        for t in range(self.nt):
-            if self.isobserved(t):
-                noise = np.random.normal(0.,sigmao,u.size)
-                self.yo[t] = np.dot(self.mat,(u + noise))
-            u = model.step(u)
-            true.append(u)
+    def gen_obs(self,model,u0,sigmao,true=None):
+        if true is None: # true trajectory
+            true=[u0]
+            u=u0
+            for t in range(self.nt):
+                u = model.step(u)
+                true.append(u)
 
-        if self.isobserved(self.nt):
-            noise = np.random.normal(0.,sigmao,u.size)
-            self.yo[self.nt] = np.dot(self.mat,(u + noise))
+        for t in range(self.nt+1):
+            if self.isobserved(t):
+                noise = np.random.normal(0.,sigmao,u0.size)
+                self.yo[t] = np.dot(self.mat,(true[t] + noise))
 
         return true
     
@@ -54,3 +57,19 @@ class Obsopt:
          if self.isobserved(t):
              return np.dot(self.mat,u) - self.yo[t]
        
+
+    def misfit_all(self,traj,Rinv):
+        ''' 
+        Misfits of the whole window in one batched operation
+         Entries:
+         traj : trajectory stacked as a (nt+1,nx) array
+         Rinv : inverse of the observation error covariance matrix (see obscov)
+         Returns Jo = sum d^T R^{-1} d and the adjoint forcing H^T R^{-1} d
+         at every time step as a (nt+1,nx) array
+        '''
+        times=[ t for t in range(self.nt+1) if self.isobserved(t) ]
+        d=np.dot(traj[times],self.mat.T) - np.array([self.yo[t] for t in times])
+        w=obscov.apply(Rinv,d)
+        forcing=np.zeros((self.nt+1,self.nx))
+        forcing[times]=np.dot(w,self.mat)
+        return np.sum(d*w), forcing
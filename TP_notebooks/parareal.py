@@ -0,0 +1,201 @@
+import math
+import functools
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from .burgers import Burgers
+    from .transfer import Transfer
+except ImportError: # run as a script from TP_notebooks
+    from burgers import Burgers
+    from transfer import Transfer
+
+# Fine model seen by the slice integrations of a worker process (set once
+# per process by _init); in serial mode each Parareal passes its own model
+_ctx={}
+
+def _init(model):
+    _ctx['model']=model
+
+def _fine(args,model=None):
+    '''
+    Fine integration of one time slice
+     Entries (packed in args):
+     u : initial state of the slice
+     nsteps : number of fine time steps
+     keep : keep the states at all the times of the slice
+     model : fine model (that of the worker process if None)
+     Returns the states at the nsteps+1 times of the slice (only the initial
+     and final ones if not keep) and the elapsed time
+    '''
+    u,nsteps,keep=args
+    if model is None:
+        model=_ctx['model']
+    tic=time.perf_counter()
+    trj=[u]
+    for it in range(nsteps):
+        u=model.step(u)
+        if keep:
+            trj.append(u)
+    if not keep:
+        trj.append(u)
+    return trj, time.perf_counter()-tic
+
+
+class CoarseBurgers:
+
+    def __init__(self,nx,dx,dt,ns,r,nsteps=None):
+        '''
+        Coarse propagator for Parareal: Burgers model on the grid coarsened
+        by a factor r, integrating the duration of nsteps fine time steps
+        with about r times fewer steps
+        Entries:
+        nx, dx, dt, ns : fine model parameters (see Burgers)
+        r : coarsening factor in space and time
+        nsteps : default number of fine time steps of a time slice (slices
+                 of other lengths are given to propagate)
+        '''
+        self.transfer=Transfer(nx,r)
+        self.nx=nx
+        self.dx=dx
+        self.dt=dt
+        self.ns=ns
+        self.r=r
+        self.nsteps=nsteps
+        self.models={} # coarse model and number of steps per slice length
+
+    def model(self,nsteps):
+        if nsteps not in self.models:
+            ncsteps=max(1,math.ceil(nsteps/self.r))
+            self.models[nsteps]=(Burgers(self.nx//self.r,self.dx*self.r,
+                                         self.dt*nsteps/ncsteps,self.ns),ncsteps)
+        return self.models[nsteps]
+
+    def propagate(self,u,nsteps=None):
+        model,ncsteps=self.model(self.nsteps if nsteps is None else nsteps)
+        uc=self.transfer.restrict(u)
+        for it in range(ncsteps):
+            uc=model.step(uc)
+        return self.transfer.prolong(uc)
+
+class Parareal:
+
+    def __init__(self,fine,coarse,nslice,nproc=None,tol=1.e-08,maxiter=None):
+        '''
+        Parareal parallel-in-time integration
+        Entries:
+        fine : fine model (its step method is used)
+        coarse : coarse propagator over one time slice (propagate method,
+                 given the number of fine steps of the slice)
+        nslice : number of time slices
+        nproc : number of worker processes for the fine integrations
+                (sequential if None)
+        tol : stop when the largest change of the slice initial states
+              between two iterations is below tol
+        maxiter : maximum number of iterations (nslice by default,
+                  for which Parareal reproduces the fine integration)
+        '''
+        self.fine=fine
+        self.coarse=coarse
+        self.nslice=nslice
+        self.tol=tol
+        self.maxiter=nslice if maxiter is None else maxiter
+        if nproc is None:
+            self.integrate=functools.partial(_fine,model=fine)
+            self.pool=None
+        else:
+            self.pool=ProcessPoolExecutor(nproc,initializer=_init,initargs=(fine,))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool=None
+
+    def sweep(self,U,lengths,first=0,keep=True):
+        ''' Fine integrations of the slices first to nslice-1 '''
+        args=[ (U[k],lengths[k],keep) for k in range(first,self.nslice) ]
+        if self.pool is None:
+            return list(map(self.integrate,args))
+        else:
+            return list(self.pool.map(_fine,args))
+
+    def run(self,u0,nt,keep=True):
+        '''
+        Integrate nt fine time steps from u0
+        After iteration k the first k slices start from their exact fine
+        initial states: their integrations are kept and not repeated.
+         Entries:
+         keep : return the whole trajectory; otherwise only the states at
+                the slice boundaries are kept (long spin-up runs, whose
+                trajectory does not fit in memory)
+         Returns the trajectory (list of nt+1 states, or of the nslice+1
+         slice boundary states if not keep) and a dictionary of statistics:
+          niter : number of iterations (fine sweeps)
+          err : change of the slice initial states at each iteration
+          defect : largest jump between the end of the fine integration of
+                   a slice and the initial state of the next one, the
+                   error source of the returned trajectory against the
+                   serial fine run (0 when it is reproduced exactly)
+          time : wall-clock time of the run
+          fine_time : summed time of the last fine integration of every
+                      slice, i.e. the cost of a serial fine run
+          speedup : measured wall-clock speedup, fine_time/time
+          critical_time : wall-clock time with one process per slice,
+                          estimated as the longest slice integration of each
+                          sweep plus the sequential coarse propagations
+          speedup_estimate : fine_time/critical_time, the speedup with one
+                             process per slice (not measured)
+        '''
+        tic=time.perf_counter()
+        nslice=self.nslice
+        bounds=[ (k*nt)//nslice for k in range(nslice+1) ]
+        lengths=[ bounds[k+1]-bounds[k] for k in range(nslice) ]
+
+        # initial coarse sweep
+        t0=time.perf_counter()
+        U=[u0]
+        G=[]
+        for k in range(nslice):
+            G.append(self.coarse.propagate(U[k],lengths[k]))
+            U.append(G[k])
+        critical=time.perf_counter()-t0
+
+        err=[]
+        res=[None]*nslice
+        niter=0
+        while True:
+            # slices before niter start from exact states: already final
+            new=self.sweep(U,lengths,niter,keep)
+            res[niter:]=new
+            critical+=max(r[1] for r in new)
+            niter+=1
+            if niter>=self.maxiter or niter>=nslice:
+                break
+
+            # sequential correction, the first niter+1 states being exact
+            t0=time.perf_counter()
+            Unew=U[:1]+[ res[k][0][-1] for k in range(niter) ]
+            for k in range(niter,nslice):
+                g=self.coarse.propagate(Unew[k],lengths[k])
+                Unew.append(g + res[k][0][-1] - G[k])
+                G[k]=g
+            critical+=time.perf_counter()-t0
+            err.append(max(np.max(np.abs(Unew[k]-U[k])) for k in range(nslice+1)))
+            U=Unew
+            if err[-1]<self.tol:
+                break
+
+        # fine trajectories of the last integration of each slice, whose
+        # initial states differ from the converged ones by less than tol
+        trj=[u0]
+        for k in range(nslice):
+            trj.extend(res[k][0][1:])
+        defect=max([0.]+[ np.max(np.abs(res[k][0][0]-res[k-1][0][-1]))
+                          for k in range(1,nslice) ])
+
+        wall=time.perf_counter()-tic
+        fine_time=sum(r[1] for r in res)
+        stats={'niter':niter,'err':err,'defect':defect,'time':wall,
+               'fine_time':fine_time,'speedup':fine_time/wall,
+               'critical_time':critical,'speedup_estimate':fine_time/critical}
+        return trj, stats
@@ -1,6 +1,12 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
+
+
+def _mpl():
+    ''' matplotlib is only imported once a figure is requested,
+    so that batch runs importing this module do not depend on it '''
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    return plt, FuncAnimation
 
 
 class animator:
@@ -14,7 +20,7 @@ class animator:
         self.ymin=ymin
         self.ymax=ymax
         self.ax=ax
-        if not isinstance(trajectories[0], (list, tuple)) :
+        if np.ndim(trajectories[0])<2 : # a single trajectory (list or 2-D array)
             trajectories=[trajectories]
         self.trajectories=trajectories
         self.ncurve=len(trajectories)
@@ -76,7 +82,7 @@ class animator:
 
 def anim(xx, nt, trajectories,**kwargs):
 
-    if not isinstance(trajectories[0], (list, tuple)) :
+    if np.ndim(trajectories[0])<2 : # a single trajectory (list or 2-D array)
         trajectories=[trajectories]
 
     if len(trajectories)==1 :
@@ -91,6 +97,8 @@ def anim(xx, nt, trajectories,**kwargs):
         
 def animation_1(xx, nt, trajectories,legends=None,colors=['k-']):
 
+    plt, FuncAnimation = _mpl()
+
     if isnotebook():
         plt.rcParams["animation.html"] = "jshtml"
 
@@ -111,12 +119,14 @@ def animation_1(xx, nt, trajectories,legends=None,colors=['k-']):
         ln1.set_data(xdata,ydata)
         return ln1,
 
-    ani = FuncAnimation(fig, update, frames=self.trajectories[0],
+    ani = FuncAnimation(fig, update, frames=trajectories[0],
                     init_func=init)
     plt.show()
 
 
 def animation_2(xx, nt, trajectories,legends=None,colors=['k-','b-']):
+
+    plt, FuncAnimation = _mpl()
     
     fig, ax = plt.subplots()
     xdata, ydata = [], []
@@ -145,6 +155,8 @@ def animation_2(xx, nt, trajectories,legends=None,colors=['k-','b-']):
 
 def animation_3(xx, nt, trajectories,legends=None,colors=['k-','b-','r-']):
 
+    plt, FuncAnimation = _mpl()
+
     fig, ax = plt.subplots()
     xdata, ydata = [], []
     ln1, = ax.plot([], [], colors[0], animated=True)
@@ -175,6 +187,8 @@ def animation_3(xx, nt, trajectories,legends=None,colors=['k-','b-','r-']):
 
 def animation_4(xx, nt, trajectories,legends=None,colors=['k-','b-','r-','g-']):
 
+    plt, FuncAnimation = _mpl()
+
     fig, ax = plt.subplots()
     xdata, ydata = [], []
     ln1, = ax.plot([], [], colors[0], animated=True)
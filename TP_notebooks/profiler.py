@@ -0,0 +1,97 @@
+import json
+import time
+import tracemalloc
+
+
+class _phase:
+    ''' Context manager accumulating the wall-clock time of one phase '''
+    def __init__(self,prof,name):
+        self.prof=prof
+        self.name=name
+
+    def __enter__(self):
+        self.tic=time.perf_counter()
+
+    def __exit__(self,*exc):
+        dt=time.perf_counter()-self.tic
+        t=self.prof.timers
+        t[self.name]=t.get(self.name,0.)+dt
+        n=self.prof.ncalls
+        n[self.name]=n.get(self.name,0)+1
+
+
+class _noop:
+    def __enter__(self):
+        pass
+
+    def __exit__(self,*exc):
+        pass
+
+_NOOP=_noop()
+
+
+class Profiler:
+
+    def __init__(self,enabled=True,memory=False):
+        '''
+        Per-phase wall-clock timers and event counters
+        Entries:
+        enabled : when False, phase and count do nothing
+        memory : sample the peak of memory allocated by python (tracemalloc)
+        Usage:
+        with prof.phase('forward'): ...
+        prof.count('model_steps')
+        '''
+        self.enabled=enabled
+        self.memory=memory and enabled
+        self.timers={}
+        self.ncalls={}
+        self.counters={}
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def phase(self,name):
+        if self.enabled:
+            return _phase(self,name)
+        return _NOOP
+
+    def count(self,name,n=1):
+        if self.enabled:
+            self.counters[name]=self.counters.get(name,0)+n
+
+    def reset(self):
+        self.timers={}
+        self.ncalls={}
+        self.counters={}
+        if self.memory:
+            tracemalloc.reset_peak()
+
+    def report(self):
+        ''' Dictionary of timers (seconds), phase calls and counters '''
+        rep={'timers':dict(self.timers),'calls':dict(self.ncalls),
+             'counters':dict(self.counters)}
+        if self.memory:
+            rep['peak_memory']=tracemalloc.get_traced_memory()[1]
+        return rep
+
+    def to_json(self,path):
+        with open(path,'w') as f:
+            json.dump(self.report(),f,indent=1,sort_keys=True)
+
+    def flat(self):
+        ''' Flat profile: phases sorted by decreasing time, then counters '''
+        total=sum(self.timers.values())
+        lines=['%-20s %10s %7s %10s'%('phase','time(s)','%','calls')]
+        for name in sorted(self.timers,key=self.timers.get,reverse=True):
+            t=self.timers[name]
+            lines.append('%-20s %10.4f %7.1f %10d'%(name,t,100.*t/total if total else 0.,
+                                                 self.ncalls[name]))
+        for name in sorted(self.counters):
+            lines.append('%-20s %10d'%(name,self.counters[name]))
+        if self.memory:
+            lines.append('%-20s %10d'%('peak_memory(B)',tracemalloc.get_traced_memory()[1]))
+        return '\n'.join(lines)
+
+
+# Disabled profiler, default of the instrumented code
+noprof=Profiler(enabled=False)
@@ -0,0 +1,96 @@
+from gausscov import *
+from analyseKF import *
+from burgers import *
+from obsnet import *
+from obsio import *
+
+import numpy as np
+import asyncio
+import os
+import tempfile
+import math
+import time
+import sys
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nwin = 10                   # number of observation files (windows)
+ntwin = 20                  # number of time steps per window
+nt = nwin*ntwin             # number of time steps
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.01              # background state error std
+sigmao = 0.01              # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Observation files: irregular network, nobst observations every iobstsub steps
+# from t=0 to t=ntwin included, as for Obsopt, so that consecutive files share
+# their boundary time, whose observations the stream merges into one batch
+
+iobstsub = 5                # Frequency of temporal subsampling of observations
+nobst = 5                   # Number of observations per observation time
+readahead = 2               # Number of files read ahead of the filter
+seed = 0                    # Seed of the observation network and noise
+# observation directory given on the command line, kept, or a temporary
+# one removed at the end of the run
+tmpdir = None if len(sys.argv)>1 else tempfile.TemporaryDirectory()
+obsdir = sys.argv[1] if tmpdir is None else tmpdir.name
+os.makedirs(obsdir,exist_ok=True)
+
+np.random.seed(seed)
+uo=np.sin(2*math.pi*xx)
+true=[uo]
+for iwin in range(nwin):
+    H = ObsNetwork(nx,ntwin)
+    for t in range(0,ntwin+1,iobstsub):
+        H.add(t,np.sort(np.random.uniform(0.,1.,nobst)),sigmao*sigmao)
+    trj = H.gen_obs(M,true[-1])
+    true.extend(trj[1:])
+    write_obs(os.path.join(obsdir,'obs%04d.npz'%iwin),H,iwin*ntwin)
+
+# Extended Kalman filter fed by the asynchronous observation stream
+
+def forecast(uu,S,nsteps):
+    for it in range(nsteps):
+        up=uu
+        uu=M.step(up)
+        # Error modes (square root of cov. matrix)
+        for imem in range(nx):
+            S[:,imem]=M.step(up + S[:,imem])-uu
+    return uu,S
+
+def cycle(uu,S,nsteps,loc,yo,var):
+    uu,S = forecast(uu,S,nsteps)
+    uu,S = analyseKF(uu,S,interp(nx,loc).toarray(),yo,np.diag(var))
+    return np.real(uu),np.real(S)
+
+async def ekf(paths):
+    B = gausscov(nx,sigmab,Lb,2)
+    uu = np.cos(2*math.pi*xx)
+    S = B.sqr.copy()
+    uana = {}
+    t = 0
+    loop = asyncio.get_running_loop()
+    async for tobs,loc,yo,var in astream(paths,readahead):
+        # computed in an executor, leaving the event loop free to keep up to
+        # readahead files read ahead meanwhile
+        uu,S = await loop.run_in_executor(None,cycle,uu,S,tobs-t,loc,yo,var)
+        t = tobs
+        uana[t] = uu
+    return uana
+
+tic=time.perf_counter()
+uana=asyncio.run(ekf(chunk_files(obsdir)))
+toc=time.perf_counter()
+if tmpdir is not None:
+    tmpdir.cleanup()
+
+err=[ math.sqrt(np.mean((uana[t]-true[t])**2)) for t in sorted(uana) ]
+print('analyses: %d, time: %.3f s'%(len(uana),toc-tic))
+print('rmse of the first and last analyses: %.2e %.2e'%(err[0],err[-1]))
@@ -2,12 +2,17 @@ from gausscov import *
 from analyseKF import *
 from burgers import *
 from obsopt import *
+from expsetup import *
 
 import numpy as np
 import math
+import sys
 
 
 
+# Batch mode: no figures, matplotlib is not imported
+batch = '--batch' in sys.argv
+
 # Space-time domain
 nx = 40                     # number of grid points
 dx = 1./nx                  # space step
@@ -40,9 +45,9 @@ yo=np.dot(H.mat,uo) + np.random.normal(0.,sigmao,H.nobs)
 # Initialization of background
 ub=np.cos(2*math.pi*xx)
 
-# Initialization of Pf matrix and its sqare root
+# Initialization of Pf matrix and its sqare root (cached on disk)
     
-B = gausscov(nx,sigmab,Lb,2)
+B = cov(nx,sigmab,Lb,2)
 Pf = B.mat
 Sf = B.sqr
 
@@ -50,37 +55,37 @@ ua,Sa = analyseKF(ub,Sf,H.mat,yo,R)
 
 Pa = np.dot(Sa , Sa.T)
 
-import matplotlib.pyplot as plt
-from matplotlib.colors import BoundaryNorm
-from matplotlib.ticker import MaxNLocator
-
-print np.dot(H.mat,xx)
-
-f, axarr = plt.subplots(2, 2)
-
-axarr[0, 0].plot(xx,uo,'k-')
-axarr[0, 0].plot(xx,ub,'b-')
-axarr[0, 0].plot(xx,ua,'r-',linewidth=3)
-axarr[0, 0].plot(np.dot(H.mat,xx),yo,'kd')
-axarr[0, 0].legend(['True','Background','Analysis','Observations'])
-axarr[0, 0].set_title('BLUE analysis')
+print('observation abscissae:', np.dot(H.mat,xx))
+print('rmse background: %.2e  analysis: %.2e'%(
+    math.sqrt(np.mean((ub-uo)**2)),math.sqrt(np.mean((np.real(ua)-uo)**2))))
 
-axarr[0, 1].set_title('BLUE increment')
-axarr[0, 1].plot(xx,ua-ub,'m-',linewidth=3)
-axarr[0, 1].plot(np.dot(H.mat,xx),np.zeros(H.nobs),'kd')
-axarr[0, 1].legend(['Increment','Observations'])
+if not batch:
 
-cmap = plt.get_cmap('PiYG')
-levels = MaxNLocator(nbins=15).tick_values(-Pf.max(), Pf.max())
-norm = BoundaryNorm(levels, ncolors=cmap.N, clip=True)
-axarr[1, 0].pcolormesh(xx, xx, Pf,cmap=cmap, norm=norm)
-axarr[1, 0].set_title('Pf')
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import BoundaryNorm
+    from matplotlib.ticker import MaxNLocator
 
-axarr[1, 1].pcolormesh(xx, xx, Pa,cmap=cmap, norm=norm)
-axarr[1, 1].set_title('Pa')
+    f, axarr = plt.subplots(2, 2)
 
+    axarr[0, 0].plot(xx,uo,'k-')
+    axarr[0, 0].plot(xx,ub,'b-')
+    axarr[0, 0].plot(xx,ua,'r-',linewidth=3)
+    axarr[0, 0].plot(np.dot(H.mat,xx),yo,'kd')
+    axarr[0, 0].legend(['True','Background','Analysis','Observations'])
+    axarr[0, 0].set_title('BLUE analysis')
 
+    axarr[0, 1].set_title('BLUE increment')
+    axarr[0, 1].plot(xx,ua-ub,'m-',linewidth=3)
+    axarr[0, 1].plot(np.dot(H.mat,xx),np.zeros(H.nobs),'kd')
+    axarr[0, 1].legend(['Increment','Observations'])
 
-plt.show()
+    cmap = plt.get_cmap('PiYG')
+    levels = MaxNLocator(nbins=15).tick_values(-Pf.max(), Pf.max())
+    norm = BoundaryNorm(levels, ncolors=cmap.N, clip=True)
+    axarr[1, 0].pcolormesh(xx, xx, Pf,cmap=cmap, norm=norm)
+    axarr[1, 0].set_title('Pf')
 
+    axarr[1, 1].pcolormesh(xx, xx, Pa,cmap=cmap, norm=norm)
+    axarr[1, 1].set_title('Pa')
 
+    plt.show()
@@ -0,0 +1,88 @@
+from burgers import *
+from gausscov import *
+from obsopt import *
+from cyclevar import *
+
+import numpy as np
+import math
+
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps per window
+nwin = 10                   # number of assimilation windows
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.02              # background state error std of the first window
+sigmaq = 0.005             # Model error std, added to the truth between windows
+sigmac = 0.005             # background error std of the cycled windows (forecast
+                           # of the previous analysis, dominated by the model error)
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Assimilation Parameters
+
+precond = True             # preconditioning by square root of B
+iobstsub = 5                # Frequency of temporal subsampling of observations, [1:nt], 1=every time step
+iobsxsub = 4                # Frequency of spatial subsampling of observations, [1:nx], 1=every space step
+seed = 0                    # Seed of the model and background errors and observation noise
+
+if precond:
+    indic=2
+else:
+    indic=1
+
+B=gausscov(nx,sigmab,Lb,indic)
+Bc=gausscov(nx,sigmac,Lb,indic)
+Q=gausscov(nx,sigmaq,Lb,2)
+Q.sqr=np.real(Q.sqr)
+if precond:
+    B.sqr=np.real(B.sqr)
+    Bc.sqr=np.real(Bc.sqr)
+
+# Observations of each window along the true trajectory, which is perturbed
+# by a model error drawn from Q at the end of each window, so that the
+# background error of the cycled windows settles around sigmac
+
+np.random.seed(seed)
+uo=np.sin(2*math.pi*xx)
+true=[]
+windows=[]
+for iwin in range(nwin):
+    H = Obsopt(nx,iobsxsub,nt,iobstsub)
+    trj=H.gen_obs(M,uo,sigmao)
+    true.append(trj[0])
+    windows.append(H)
+    uo=trj[nt] + Q.sqr.dot(np.random.normal(0.,1.,nx))
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+
+# Background of the first window drawn from B around the truth
+
+ub=true[0]
+if precond:
+    ub=ub + B.sqr.dot(np.random.normal(0.,1.,nx))
+else:
+    ub=ub + np.random.multivariate_normal(np.zeros(nx),B.mat)
+
+# Cycled minimisations, with and without reuse of the curvature pairs of
+# the previous window (the first window, with its own B, is not preconditioned)
+
+for reuse in [False, True]:
+    cyc=Cycle(M,B,R,nt,precond,reuse=reuse,Bcycle=Bc)
+    ana,bkg,stats=cyc.run(ub,windows)
+    print('reuse of curvature pairs:', reuse)
+    print(' window   nit  nfev  ngev   time(s)  rmse(bkg)  rmse(ana)  stop')
+    for iwin in range(nwin):
+        s=stats[iwin]
+        eb=math.sqrt(np.mean((bkg[iwin]-true[iwin])**2))
+        ea=math.sqrt(np.mean((ana[iwin]-true[iwin])**2))
+        print('%7d %5d %5d %5d %9.4f %10.2e %10.2e  %s'%(iwin,s['nit'],s['nfev'],s['ngev'],s['time'],eb,ea,s['message']))
+    print(' cycled windows: iterations:', sum(s['nit'] for s in stats[1:]),
+          ' evaluations:', sum(s['nfev']+s['ngev'] for s in stats[1:]),
+          ' time: %.4f s'%sum(s['time'] for s in stats[1:]))
@@ -0,0 +1,78 @@
+from burgers import *
+from gausscov import *
+from diffcov import *
+from obsopt import *
+from simvar import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+import time
+
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+m = 10                     # number of diffusion steps
+
+# Correlations and variances: regular grid, irregular grid (exact
+# normalisation) and randomised normalisation
+
+nx = 40
+xx = np.array(range(nx))/nx
+B = diffcov(nx,sigmab,Lb,m)
+e = np.zeros(nx); e[nx//2] = 1.
+print('correlations with the middle point (diffusion, gaussian):')
+print(np.round(B.mat.dot(e)[nx//2:nx//2+6]/sigmab**2,3))
+print(np.round(np.exp(-(xx[:6]**2)/(2.*Lb*Lb)),3))
+
+np.random.seed(0)
+xirr = np.sort(np.random.uniform(0.,1.,nx))
+Birr = diffcov(xirr,sigmab,Lb,m)
+var = np.diag(Birr.mat.matmat(np.eye(nx)))
+print('irregular grid, variances / sigmab^2: min %.4f max %.4f'%(var.min()/sigmab**2,var.max()/sigmab**2))
+Brnd = diffcov(nx,sigmab,Lb,m,nrand=1000)
+var = np.diag(Brnd.mat.matmat(np.eye(nx)))
+print('randomised normalisation (1000 vectors), variances / sigmab^2: mean %.4f std %.4f'%(
+      np.mean(var)/sigmab**2,np.std(var)/sigmab**2))
+
+# Cost of one product with B^{1/2} and its adjoint, correlation length
+# of 2 grid points (randomised normalisation with 100 vectors)
+
+print('       nx  setup(s)  sqr+sqr^T(s)')
+for n in [1000, 10000, 100000, 1000000]:
+    t0=time.perf_counter()
+    Bn=diffcov(n,sigmab,Lb*40./n,m,nrand=100)
+    ts=time.perf_counter()-t0
+    v=np.random.normal(0.,1.,n)
+    t0=time.perf_counter()
+    Bn.sqr.T.dot(Bn.sqr.dot(v))
+    print('%9d %9.4f %13.5f'%(n,ts,time.perf_counter()-t0))
+
+# 4D-Var of run_var.py with the gaussian and the diffusion covariances
+
+dx = 1./nx                  # space step
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+iobstsub = 5                # Frequency of temporal subsampling of observations
+iobsxsub = 8                # Frequency of spatial subsampling of observations
+
+M=Burgers(nx,dx,dt,ns)
+H=Obsopt(nx,iobsxsub,nt,iobstsub)
+np.random.seed(0)
+true=H.gen_obs(M,np.sin(2*math.pi*xx),sigmao)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+ub=np.cos(2.*math.pi*xx)
+
+for name,Bv in [('gausscov',gausscov(nx,sigmab,Lb,2)),('diffcov',B)]:
+    var=Variational(ub,nt,Bv,M,H,R,True)
+    res = opt.minimize(var.cost,np.zeros(nx),
+                       method='L-BFGS-B',
+                       jac=var.grad,
+                       options={'gtol': 1e-05, 'maxiter': 10000})
+    ua=ub + Bv.sqr.dot(res['x'])
+    print('%-9s iterations: %4d  rmse background: %.2e  analysis: %.2e'%(
+        name,res['nit'],math.sqrt(np.mean((ub-true[0])**2)),
+        math.sqrt(np.mean((ua-true[0])**2))))
@@ -0,0 +1,67 @@
+from burgers import *
+from gausscov import *
+from simvar import *
+from obsopt import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Assimilation Parameters
+
+iobstsub = 5                # Frequency of temporal subsampling of observations, [1:nt], 1=every time step
+iobsxsub = 8                # Frequency of spatial subsampling of observations, [1:nx], 1=every space step
+nens = 20                   # Number of ensemble members
+nspin = 10                  # Length of the ensemble forecast giving the perturbations
+Lloc = 0.1                  # Localisation length
+seed = 0                    # Seed of the observation noise and ensemble
+
+np.random.seed(seed)
+
+# Observation operator and error covariance matrix
+
+H = Obsopt(nx,iobsxsub,nt,iobstsub)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+
+# True and background states nspin steps before the window; the background
+# error is drawn from B, and the ensemble forecast samples its evolution
+B=gausscov(nx,sigmab,Lb,2)
+uo=np.sin(2*math.pi*xx)
+ub=uo + B.sqr.dot(np.random.normal(0.,1.,nx))
+X=ensemble(M,ub,B.sqr,nens,nspin)
+for it in range(nspin):
+    uo=M.step(uo)
+    ub=M.step(ub)
+
+true=H.gen_obs(M,uo,sigmao)
+
+Lsqr=np.real(gausscov(nx,1.,Lloc,2).sqr)
+
+# Static, hybrid and ensemble background covariances
+
+for betac,betae in [(1.,0.),(0.5,0.5),(0.,1.)]:
+    var=HybridVariational(ub,nt,B,M,H,R,X,betac,betae,Lsqr)
+    res = opt.minimize(var.cost,np.zeros(var.nctl),
+                       method='L-BFGS-B',
+                       jac=var.grad,
+                       options={'gtol': 1e-05, 'maxiter': 10000})
+    ua=var.ctl2state(res['x'])[0]
+    print('betac=%.1f betae=%.1f: %4d iterations, rmse background %.2e analysis %.2e'%(
+        betac,betae,res['nit'],math.sqrt(np.mean((ub-true[0])**2)),
+        math.sqrt(np.mean((ua-true[0])**2))))
@@ -0,0 +1,63 @@
+from burgers import *
+from gausscov import *
+from gccov import *
+from obsopt import *
+from simvar import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+import time
+
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Cost of the covariance set up: dense square root by sqrtm against
+# the sparse Cholesky factor of the Gaspari-Cohn correlations, with a
+# correlation length of 2 grid points (Lb at nx=40) as the grid is refined
+
+print('     nx  nband  gausscov(s)  gccov(s)')
+for nx in [40, 400, 1000, 10000, 100000]:
+    L=Lb*40./nx
+    t0=time.perf_counter()
+    Bgc=gccov(nx,sigmab,L)
+    tgc=time.perf_counter()-t0
+    if nx<=1000:
+        t0=time.perf_counter()
+        gausscov(nx,sigmab,L,2)
+        tg='%12.4f'%(time.perf_counter()-t0)
+    else:
+        tg='%12s'%'-'
+    print('%7d %6d %s %9.4f'%(nx,Bgc.nband,tg,tgc))
+
+# 4D-Var of run_var.py with both covariances
+
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+iobstsub = 5                # Frequency of temporal subsampling of observations
+iobsxsub = 8                # Frequency of spatial subsampling of observations
+
+M=Burgers(nx,dx,dt,ns)
+H=Obsopt(nx,iobsxsub,nt,iobstsub)
+np.random.seed(0)
+true=H.gen_obs(M,np.sin(2*math.pi*xx),sigmao)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+ub=np.cos(2.*math.pi*xx)
+
+for name,B in [('gausscov',gausscov(nx,sigmab,Lb,2)),('gccov',gccov(nx,sigmab,Lb))]:
+    var=Variational(ub,nt,B,M,H,R,True)
+    res = opt.minimize(var.cost,np.zeros(nx),
+                       method='L-BFGS-B',
+                       jac=var.grad,
+                       options={'gtol': 1e-05, 'maxiter': 10000})
+    ua=ub + B.sqr.dot(res['x'])
+    print('%-9s iterations: %4d  rmse background: %.2e  analysis: %.2e'%(
+        name,res['nit'],math.sqrt(np.mean((ub-true[0])**2)),
+        math.sqrt(np.mean((ua-true[0])**2))))
@@ -0,0 +1,77 @@
+from burgers import *
+from gausscov import *
+from obsopt import *
+from simvar import *
+from multires import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+import time
+
+
+# Space-time domain
+nx = 160                    # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 40                     # number of time steps (the shock forms after about 50)
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Observations
+iobstsub = 8                # Frequency of temporal subsampling of observations
+iobsxsub = 8                # Frequency of spatial subsampling of observations
+seed = 0                    # Seed of the observation noise
+
+H = Obsopt(nx,iobsxsub,nt,iobstsub)
+np.random.seed(seed)
+uo=np.sin(2*math.pi*xx)
+true=H.gen_obs(M,uo,sigmao)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+
+# Background: the truth plus an error drawn from B
+B=gausscov(nx,sigmab,Lb,2)
+B.sqr=np.real(B.sqr)
+ub=uo + B.sqr.dot(np.random.normal(0.,1.,nx))
+
+def rmse(u):
+    return math.sqrt(np.mean((u-true[0])**2))
+
+# Full resolution 4D-Var and multi-resolution 4D-Var (outer loops at full
+# resolution, inner loops on grids coarsened in space and time by the
+# factors of levels) at equal budgets of inner iterations. The setup time
+# (mostly the gausscov of each level) is reported separately.
+# At these grid sizes a coarse model step is not much cheaper than a fine
+# one (numpy overhead): at the same budget the multi-resolution runs reach
+# about the same error, at best about 1.5 times faster than the full
+# resolution one, a gain the setup time mostly cancels
+
+budget = 60                 # total number of inner iterations
+
+tic=time.perf_counter()
+var=Variational(ub,nt,B,M,H,R,True)
+res = opt.minimize(var.cost,np.zeros(nx),
+                   method='L-BFGS-B',
+                   jac=var.grad,
+                   options={'gtol': 1e-05, 'maxiter': budget})
+ua=ub + B.sqr.dot(res['x'])
+print('background rmse %.2e'%rmse(ub))
+print('full resolution    %4d iterations  %7.3f s                 rmse analysis %.2e'%(
+      res['nit'],time.perf_counter()-tic,rmse(ua)))
+
+for levels in [(2,2), (2,1), (2,2,1), (4,2,1)]:
+    tic=time.perf_counter()
+    mr=MultiResVariational(ub,nt,M,H,R,sigmab,Lb,levels,maxiter=budget//len(levels))
+    setup=time.perf_counter()-tic
+    ua,stats=mr.run()
+    print('levels %-10s %4d iterations  %7.3f s (setup %.3f s)  rmse analysis %.2e'%(
+          str(levels),sum(s['nit'] for s in stats),sum(s['time'] for s in stats),setup,rmse(ua)))
+    for s in stats:
+        print('   r=%d nit=%4d Jo(guess)=%10.3e %7.3f s'%(s['r'],s['nit'],s['Jo'],s['time']))
@@ -0,0 +1,86 @@
+from burgers import *
+from obsopt import *
+from parareal import *
+
+import numpy as np
+import math
+import time
+import os
+
+
+# Space-time domain
+nx = 32000                  # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 32000                  # number of time steps of the spin-up run (t=0.5,
+                            # about three times the shock formation time)
+ntobs = 400                 # number of time steps of the observed nature run
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Parareal parameters
+
+nslice = 40                 # number of time slices of the spin-up run
+nslobs = 4                  # number of time slices of the nature run
+nproc = min(nslice,os.cpu_count() or 1) # number of worker processes
+r = 10                      # coarsening factor of the coarse propagator
+tol = 1.e-04                # tolerance on the slice initial states, well
+                            # below the observation error
+
+# Observations of the nature run
+sigmao = 0.01              # Observation error std
+iobstsub = 50               # Frequency of temporal subsampling of observations
+iobsxsub = 20               # Frequency of spatial subsampling of observations
+
+def report(name,nslice,stats,tserial,err):
+    print(name)
+    print('  serial run          : %.3f s'%tserial)
+    print('  parareal run        : %.3f s, %d iterations for %d slices, measured speedup %.2f with %d process(es)'%(
+          stats['time'],stats['niter'],nslice,stats['speedup'],nproc))
+    print('  increments          :', ' '.join('%.1e'%e for e in stats['err']))
+    # with one process per slice, the wall-clock time would be the critical
+    # path: longest slice integration of each sweep plus the coarse propagations
+    print('  estimated speedup   : %.2f with one process per slice (critical path %.3f s)'%(
+          stats['speedup_estimate'],stats['critical_time']))
+    print('  max error vs serial : %.2e (largest slice defect %.1e)'%(err,stats['defect']))
+
+if __name__ == '__main__':
+
+    uo=np.sin(2.*math.pi*xx)
+    G=CoarseBurgers(nx,dx,dt,ns,r)
+
+    # Spin-up: only the final state is needed, the slice boundary states
+    # alone are kept (the whole trajectory would take nt*nx*8 bytes)
+    tic=time.perf_counter()
+    u=uo
+    for it in range(nt):
+        u=M.step(u)
+    tserial=time.perf_counter()-tic
+    para=Parareal(M,G,nslice,nproc if nproc>1 else None,tol)
+    states,stats=para.run(uo,nt,keep=False)
+    para.close()
+    report('spin-up run, %d steps'%nt,nslice,stats,tserial,np.max(np.abs(states[-1]-u)))
+
+    # Nature run from the spun-up state, whose trajectory is observed. Its
+    # slices (100 steps) are too short for the Lax-Friedrichs diffusion to
+    # damp the error of the coarse propagator at the shock, which the r
+    # times coarser grid smears: Parareal needs as many iterations as
+    # slices and does not pay off. It does on the spin-up run, whose
+    # 800-step slices damp that error
+    u0=states[-1]
+    tic=time.perf_counter()
+    ref=[u0]
+    for it in range(ntobs):
+        ref.append(M.step(ref[-1]))
+    tserial=time.perf_counter()-tic
+    para=Parareal(M,G,nslobs,min(nslobs,nproc) if nproc>1 else None,tol)
+    true,stats=para.run(u0,ntobs)
+    para.close()
+    report('nature run, %d steps'%ntobs,nslobs,stats,tserial,
+           max(np.max(np.abs(a-b)) for a,b in zip(true,ref)))
+    del ref
+
+    H = Obsopt(nx,iobsxsub,ntobs,iobstsub)
+    H.gen_obs(M,u0,sigmao,true)
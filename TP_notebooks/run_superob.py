@@ -0,0 +1,57 @@
+from gausscov import *
+from simvar import *
+from obsnet import *
+from superobs import *
+from expsetup import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+import time
+
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+Lb = 0.05                  # Correlation length for B matrix
+
+# Dense observation network and super-observation boxes
+
+iobstsub = 1                # Frequency of temporal subsampling of observations
+iobsxsub = 1                # Frequency of spatial subsampling of observations
+seed = 0                    # Seed of the observation noise
+dxbox = 0.1                 # super-observation box size in space
+dtbox = 5                   # super-observation box size in time steps
+
+M,H,B,true,ubkg = setup(nx,dt,nt,ns,sigmab,sigmao,Lb,iobsxsub,iobstsub,2,seed)
+
+# The averages over dtbox time steps are given a representativeness error
+# variance for the evolution of the signal within the box, estimated by
+# superob (rep=None); averages over space only (dtbox=1) are exact
+
+networks={'full':network(H,sigmao)}
+for name,method,dtb in [('average','average',dtbox),('average1','average',1),('thin','thin',dtbox)]:
+    networks[name],rep = superob(networks['full'],dxbox,dtb,method)
+    print('%-8s: %d -> %d observations (reduction x%.1f), rep std %.1e'%(name,rep['nobs_in'],
+          rep['nobs_out'],rep['reduction'],math.sqrt(rep['rep'])))
+
+for name,N in networks.items():
+    var=Variational(ubkg[0],nt,B,M,N,None,True)
+    tic=time.perf_counter()
+    res = opt.minimize(var.cost,np.zeros(nx),
+                       method='L-BFGS-B',
+                       jac=var.grad,
+                       options={'gtol': 1e-05, 'maxiter': 10000})
+    toc=time.perf_counter()
+    ua=ubkg[0] + B.sqr.dot(res['x'])
+    # consistency of the error variances: mean of (Hx_true-yo)^2/var, about 1
+    chi2=np.mean(np.concatenate([ (N.mat[t].dot(true[t])-N.yo[t])**2/N.var[t] for t in N.times() ]))
+    print('%-8s: %5d iterations, %.3f s, rmse analysis %.2e, obs chi2 %.2f'%(name,res['nit'],toc-tic,
+          math.sqrt(np.mean((ua-true[0])**2)),chi2))
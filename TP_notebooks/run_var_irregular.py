@@ -0,0 +1,64 @@
+from burgers import *
+from gausscov import *
+from simvar import *
+from obsnet import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 20                     # number of time steps
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std (varies by a factor 1 to 3)
+Lb = 0.05                  # Correlation length for B matrix
+
+# Irregular observation network
+
+iobstsub = 5                # Frequency of temporal subsampling of observations
+nobst = 6                   # Number of observations per observation time
+seed = 0                    # Seed of the observation network and noise
+
+np.random.seed(seed)
+H = ObsNetwork(nx,nt)
+for t in range(0,nt+1,iobstsub):
+    loc = np.sort(np.random.uniform(0.,1.,nobst))          # off-grid locations
+    sig = sigmao*np.random.uniform(1.,3.,nobst)             # per-observation std
+    H.add(t,loc,sig*sig)
+
+# Initialization of true field uo
+uo=np.sin(2*math.pi*xx);
+true=H.gen_obs(M,uo)
+
+# Initialization of background
+ub=np.cos(2.*math.pi*xx)
+ubkg=[ub]
+for it in range(nt):
+    ub=M.step(ub)
+    ubkg.append(ub)
+
+B=gausscov(nx,sigmab,Lb,2)
+
+# Actual minimisation: the variances are held by the network, R=None
+
+var=Variational(ubkg[0],nt,B,M,H,None,True)
+
+res = opt.minimize(var.cost,np.zeros(nx),
+                   method='L-BFGS-B',
+                   jac=var.grad,
+                   options={'gtol': 1e-05, 'maxiter': 10000})
+
+ua=ubkg[0] + B.sqr.dot(res['x'])
+print('observations:', H.nobs, ' iterations:', res['nit'])
+print('rmse background: %.2e  analysis: %.2e'%(math.sqrt(np.mean((ubkg[0]-true[0])**2)),
+                                              math.sqrt(np.mean((ua-true[0])**2))))
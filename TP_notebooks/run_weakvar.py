@@ -0,0 +1,102 @@
+from burgers import *
+from gausscov import *
+from obsopt import *
+from simvar import *
+from weakvar import *
+
+import numpy as np
+import scipy.optimize as opt
+import math
+import time
+
+
+# Space-time domain
+nx = 40                     # number of grid points
+dx = 1./nx                  # space step
+xx = np.array(range(nx))*dx # grid points abscissa
+dt = 0.5*dx                 # time step
+nt = 40                     # number of time steps
+ns = 0                      # numerical scheme
+
+M=Burgers(nx,dx,dt,ns)
+
+# Error staristics
+sigmab = 0.02              # background state error std
+sigmao = 0.001             # Observation error std
+sigmaq = 0.01              # Model error std
+Lb = 0.05                  # Correlation length for B matrix
+Lq = 0.05                  # Correlation length for Q matrix
+
+# Assimilation Parameters
+
+nsub = 4                    # number of sub-windows
+nproc = 4                   # number of worker processes
+iobstsub = 5                # Frequency of temporal subsampling of observations, [1:nt], 1=every time step
+iobsxsub = 8                # Frequency of spatial subsampling of observations, [1:nx], 1=every space step
+seed = 0                    # Seed of the model errors, background error and observation noise
+
+if __name__ == '__main__':
+
+    # Observation operator and error covariance matrix
+
+    H = Obsopt(nx,iobsxsub,nt,iobstsub)
+    R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
+
+    B=gausscov(nx,sigmab,Lb,2)
+    B.sqr=np.real(B.sqr)
+    Q=gausscov(nx,sigmaq,Lq,2)
+    Q.sqr=np.real(Q.sqr)
+
+    # True trajectory from uo=sin, with model errors drawn from Q at the
+    # sub-window boundaries, and background drawn from B around it
+    np.random.seed(seed)
+    bounds=[ (k*nt)//nsub for k in range(nsub+1) ]
+    u=np.sin(2*math.pi*xx)
+    true=[u]
+    for it in range(1,nt+1):
+        u=M.step(u)
+        if it in bounds[1:-1]:
+            u=u + Q.sqr.dot(np.random.normal(0.,1.,nx))
+        true.append(u)
+    H.gen_obs(M,true[0],sigmao,true)
+    ub=true[0] + B.sqr.dot(np.random.normal(0.,1.,nx))
+    ubkg=[ub]
+    for it in range(nt):
+        ub=M.step(ub)
+        ubkg.append(ub)
+
+    def report(name,nit,elapsed,x,bounds):
+        # rmse at the beginning and end of the window, the last sub-window
+        # being run from its initial state
+        u=x[-1]
+        for it in range(bounds[-2],bounds[-1]):
+            u=M.step(u)
+        print('%-24s iterations: %4d  time: %7.3f s  rmse(t=0): %.2e  rmse(t=nt): %.2e'%(
+              name,nit,elapsed,math.sqrt(np.mean((x[0]-true[0])**2)),
+              math.sqrt(np.mean((u-true[nt])**2))))
+
+    report('background',0,0.,[ubkg[0]],[0,nt])
+
+    # Strong-constraint baseline on the same window
+    var=Variational(ubkg[0],nt,B,M,H,R,True)
+    tic=time.perf_counter()
+    res = opt.minimize(var.cost,np.zeros(nx),
+                       method='L-BFGS-B',
+                       jac=var.grad,
+                       options={'gtol': 1e-05, 'maxiter': 10000})
+    toc=time.perf_counter()
+    report('strong constraint',res['nit'],toc-tic,[ubkg[0] + B.sqr.dot(res['x'])],[0,nt])
+
+    # Weak constraint: forcing formulation, then state formulation
+    # (sub-windows swept serially, then concurrently)
+    for form,np_ in [('forcing',None),('state',None),('state',nproc)]:
+        var=WeakVariational(ubkg,nt,nsub,B,Q,M,H,R,np_,form)
+        tic=time.perf_counter()
+        res = opt.minimize(var.cost,np.zeros(nsub*nx),
+                           method='L-BFGS-B',
+                           jac=var.grad,
+                           options={'gtol': 1e-05, 'maxiter': 10000})
+        toc=time.perf_counter()
+        x=var.ctl2state(res['x'])
+        var.close()
+        report('%s, %d process(es)'%(form,np_ or 1),res['nit'],toc-tic,x,var.bounds)
@@ -1,13 +1,19 @@
 import numpy as np
-from scipy.linalg import inv
+try:
+    from . import obscov
+    from .profiler import noprof
+except ImportError: # run as a script from TP_notebooks
+    import obscov
+    from profiler import noprof
 
 class Variational:
-    def __init__(self,ubkg=None, nt=None, B=None, M=None, H=None, R=None, precond=True):
+    def __init__(self,ubkg=None, nt=None, B=None, M=None, H=None, R=None, precond=True, prof=noprof):
         self.prec=precond
+        self.prof=prof # Profiler, timing the phases of simvar
         self.B=B
         self.M=M
         self.H=H
-        self.Rinv=inv(R)
+        self.Rinv=None if R is None else obscov.inverse(R) # None: variances held by H
         self.ubkg=ubkg
         self.nt = nt
 
@@ -22,63 +28,137 @@ class Variational:
         g = self.simvar(v,2)
 
         return g
-        
-    def simvar(self,v,indic):
-        
-        # Change of variable if precond
+
+    def ctl2state(self,v):
+        '''
+        Change of variable: initial state, gradient and cost of the
+        background term
+        '''
         if self.prec :
             u  = self.B.sqr.dot(v) + self.ubkg
             gb = v        # gradient of background term
             Jb = v.dot(v) # cost of background term
         else:
             u  = v + self.ubkg
-            gb = np.dot(self.B.inv,v) # gradient of background term
-            Jb = np.dot(v,gb)         # cost of background term
+            gb = self.B.inv.dot(v) # gradient of background term
+            Jb = np.dot(v,gb)      # cost of background term
+        return u, gb, Jb
+
+    def ctl2state_adj(self,uad,gb):
+        '''
+        Adjoint of the change of variable, plus background term: total gradient
+        '''
+        if self.prec :
+            return self.B.sqr.T.dot(uad) + gb
+        else:
+            return uad + gb
+        
+    def simvar(self,v,indic):
+
+        prof=self.prof
+        prof.count('cost_evals' if indic==1 else 'grad_evals')
+
+        # Change of variable if precond
+        with prof.phase('bsqr'):
+            u,gb,Jb = self.ctl2state(v)
 
-        u_trj=list()                    # Storage of reference trajectory
+        # Storage of reference trajectory
+        u_trj=np.empty((self.nt+1,self.M.nx))
 
         # Time Loop. Cost function evaluation
-        Jo=0.
-        for it in range(self.nt):
-            u_trj.append(u)
-            if self.H.isobserved(it):
-                misfit=self.H.misfit(it,u) # d=Hx-xobs
-                Jo=Jo+misfit.dot(self.Rinv.dot(misfit))
-            u=self.M.step(u)
-
-        if self.H.isobserved(self.nt):
-            misfit=self.H.misfit(self.nt,u) # d=Hx-xobsx
-            Jo=Jo+misfit.dot(self.Rinv.dot(misfit))
-            
+        with prof.phase('forward'):
+            for it in range(self.nt):
+                u_trj[it]=u
+                u=self.M.step(u)
+            u_trj[self.nt]=u
+        prof.count('model_steps',self.nt)
+
+        # All misfits d=Hx-xobs at once, and adjoint forcings H^T R^-1 d
+        with prof.phase('misfit'):
+            Jo,forcing=self.H.misfit_all(u_trj,self.Rinv)
+
         J=0.5*(Jb+Jo) # Total cost function
         # print 'J: ',J
         if indic==2 :
             # reverse time loop, Gradient evaluation
 
-            uad=np.zeros(self.M.nx)
+            uad=forcing[self.nt]
 
-            if self.H.isobserved(self.nt):
-                misfit=self.H.misfit(self.nt,u) # d=Hx-xobs
-                uad = uad + self.H.adj(self.nt,self.Rinv.dot(misfit))
-
-            for itr in reversed(range(self.nt)):
-                # Retreive chekpoints
-                u  = u_trj[itr]
-                # One backward step
-                uad=self.M.step_adj(u,uad);
-                # Calculation of adjoint forcing
-                if self.H.isobserved(itr):
-                    misfit=self.H.misfit(itr,u) # d=Hx-xobs
-                    uad = uad + self.H.adj(itr,self.Rinv.dot(misfit))
+            with prof.phase('adjoint'):
+                for itr in reversed(range(self.nt)):
+                    # One backward step from the checkpoint, plus adjoint forcing
+                    uad=self.M.step_adj(u_trj[itr],uad) + forcing[itr]
+            prof.count('adjoint_steps',self.nt)
 
             # Adjoint of the change of varable, if needed 
-            if self.prec :
-                g=np.transpose(self.B.sqr).dot(uad) + gb # total gradient
-            else:
-                g=uad + gb
+            with prof.phase('bsqr'):
+                g=self.ctl2state_adj(uad,gb) # total gradient
             # print 'G: ',g.dot(g)
             return g
 
         else:
 
             return J
+
+
+def ensemble(M,u0,Bsqr,nens,nsteps):
+    '''
+    Ensemble perturbations from a batched Burgers ensemble forecast
+     Entries:
+     M : model
+     u0 : initial state, perturbed with B^{1/2} noise
+     Bsqr : square root of the initial error covariance matrix
+     nens : number of members
+     nsteps : number of time steps of the forecast
+     Returns the forecast perturbations to the ensemble mean, normalised by
+     sqrt(nens-1), as a (nens,nx) array
+    '''
+    E=u0 + np.transpose(Bsqr.dot(np.random.normal(0.,1.,(M.nx,nens))))
+    for it in range(nsteps):
+        E=M.step(E)
+    return (E-E.mean(axis=0))/np.sqrt(nens-1)
+
+
+class HybridVariational(Variational):
+    def __init__(self,ubkg=None, nt=None, B=None, M=None, H=None, R=None, X=None,
+                 betac=0.5, betae=0.5, Lsqr=None, prof=noprof):
+        '''
+        Hybrid ensemble-variational 4D-Var (always preconditioned): the control
+        vector [v, a_1, ..., a_nens] gives the increment
+          sqrt(betac) B^{1/2} v + sqrt(betae) sum_k X_k o (L^{1/2} a_k)
+        whose background covariance is betac B + betae (X^T X) o L
+         Entries:
+         X : ensemble perturbations, (nens,nx) array (see ensemble)
+         betac, betae : weights of the static and ensemble covariances
+         Lsqr : square root of the localisation matrix, (nx,nl) array;
+                without localisation, the a_k are scalars
+        '''
+        Variational.__init__(self,ubkg,nt,B,M,H,R,True,prof)
+        self.X=X
+        self.nens=X.shape[0]
+        self.betac=betac
+        self.betae=betae
+        self.Lsqr=Lsqr
+        self.nl=1 if Lsqr is None else Lsqr.shape[1]
+        self.nctl=M.nx + self.nens*self.nl # size of the control vector
+
+    def ctl2state(self,v):
+        nx=self.M.nx
+        a=v[nx:].reshape(self.nens,self.nl)
+        if self.Lsqr is None:
+            due=a[:,0].dot(self.X)
+        else:
+            due=np.sum(self.X*np.dot(a,self.Lsqr.T),axis=0)
+        u=(self.ubkg + np.sqrt(self.betac)*self.B.sqr.dot(v[:nx])
+                     + np.sqrt(self.betae)*due)
+        return u, v, v.dot(v)
+
+    def ctl2state_adj(self,uad,gb):
+        g=np.empty(self.nctl)
+        g[:self.M.nx]=np.sqrt(self.betac)*self.B.sqr.T.dot(uad)
+        if self.Lsqr is None:
+            gad=self.X.dot(uad)
+        else:
+            gad=np.dot(self.X*uad,self.Lsqr)
+        g[self.M.nx:]=np.sqrt(self.betae)*np.ravel(gad)
+        return g + gb
@@ -0,0 +1,115 @@
+import numpy as np
+import scipy.sparse as sp
+try:
+    from .obsnet import ObsNetwork
+except ImportError: # run as a script from TP_notebooks
+    from obsnet import ObsNetwork
+
+
+def _time_rep(sbox,st,ms,ws,ts):
+    '''
+    Representativeness variance of time-averaged super-observations
+     Entries:
+     sbox, st : box and time of each box mean
+     ms, ws : box means at each observation time and their summed weights
+     ts : time assigned to the super-observation of each box
+     The box means are fitted by a weighted quadratic in time: the error
+     of the time average against the value at ts is the mean of the fit
+     minus its value at ts (a linear evolution averages out). Returns the
+     mean square error over the boxes with 3 times or more
+    '''
+    e=[]
+    for b in np.unique(sbox):
+        k=np.flatnonzero(sbox==b)
+        if k.size<3:
+            continue
+        dt=st[k]-ts[b]
+        c=np.polyfit(dt,ms[k],2,w=np.sqrt(ws[k]))
+        e.append(np.sum(ws[k]*np.polyval(c,dt))/np.sum(ws[k]) - c[2])
+    if not e:
+        if np.any(np.bincount(sbox)>1):
+            raise ValueError('rep cannot be estimated with less than 3 times per box, give it')
+        return 0.
+    return float(np.mean(np.square(e)))
+
+
+def superob(H,dxbox,dtbox=1,method='average',inflate=1.,rep=None):
+    '''
+    Observation thinning or super-observations on a space-time grid of boxes
+     Entries:
+     H : ObsNetwork with its observations yo (see obsnet.network for an Obsopt)
+     dxbox : box size in space (abscissa units, grid is [0,1))
+     dtbox : box size in time steps
+     method : 'average' replaces the observations of a box by their inverse
+              variance weighted mean, observed by the same weighted mean of
+              their operators at the weighted mean time (exact if dtbox=1);
+              'thin' keeps the observation closest to the box centre
+     inflate : factor applied to the error variance of the retained
+               observations (e.g. for correlated errors)
+     rep : representativeness error variance added to the retained
+           observations of both methods. By default (None) it is 0 for
+           'thin' and for boxes observed at a single time, and, for the
+           'average' boxes observed at several times, it is estimated for
+           the evolution of the signal within dtbox: the error of the time
+           average against the value at its time, from a weighted quadratic
+           fit in time of the box means of each observation time, mean
+           square over the boxes
+     Returns the reduced ObsNetwork and a report dictionary
+     (nobs_in, nobs_out, reduction factor, rep the added variance)
+    '''
+    times=[ t for t in H.times() if t in H.yo ]
+    t=np.concatenate([ np.full(H.loc[s].size,s) for s in times ])
+    loc=np.concatenate([ np.mod(H.loc[s],1.) for s in times ])
+    y=np.concatenate([ H.yo[s] for s in times ])
+    var=np.concatenate([ H.var[s] for s in times ])
+    rows=sp.vstack([ H.mat[s] for s in times ]).tocsr()
+
+    nbx=int(np.ceil(1./dxbox))
+    ix=np.minimum((loc/dxbox).astype(int),nbx-1)
+    it=t//dtbox
+    box,inv=np.unique(it*nbx+ix,return_inverse=True)
+    nbox=box.size
+
+    if method=='average':
+        w=1./var
+        wsum=np.bincount(inv,w,nbox)
+        # weighted averaging matrix, boxes x observations
+        A=sp.csr_matrix((w/wsum[inv],(inv,np.arange(y.size))),shape=(nbox,y.size))
+        ys=A.dot(y)
+        mats=A.dot(rows).tocsr()
+        locs=A.dot(loc)
+        ts=np.rint(A.dot(t)).astype(int)
+        # weighted means of each box at each of its observation times
+        sub,sinv=np.unique(inv*(H.nt+1)+t,return_inverse=True)
+        sbox=sub//(H.nt+1)
+        ntimes=np.bincount(sbox,minlength=nbox)
+        if rep is None:
+            ws=np.bincount(sinv,w)
+            rep=_time_rep(sbox,sub%(H.nt+1),np.bincount(sinv,w*y)/ws,ws,ts)
+            vars_=inflate/wsum + np.where(ntimes>1,rep,0.)
+        else:
+            vars_=inflate/wsum + rep
+    elif method=='thin':
+        # distance to the box centre, in box units
+        dist=(loc/dxbox-ix-0.5)**2 + ((t-it*dtbox-0.5*(dtbox-1))/dtbox)**2
+        order=np.lexsort((dist,inv))
+        first=order[np.r_[True,inv[order][1:]!=inv[order][:-1]]]
+        ys=y[first]
+        mats=rows[first]
+        locs=loc[first]
+        ts=t[first]
+        if rep is None:
+            rep=0.
+        vars_=inflate*var[first] + rep
+    else:
+        raise ValueError('unknown superob method')
+
+    S=ObsNetwork(H.nx,H.nt)
+    for s in np.unique(ts):
+        k=np.flatnonzero(ts==s)
+        k=k[np.argsort(locs[k])]
+        S.add(int(s),locs[k],vars_[k],ys[k],mats[k])
+
+    report={'nobs_in':y.size,'nobs_out':S.nobs,'reduction':y.size/max(S.nobs,1),
+            'rep':rep}
+    return S, report
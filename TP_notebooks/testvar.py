@@ -2,6 +2,7 @@ from burgers import *
 from gausscov import *
 from simvar import *
 from obsopt import *
+from expsetup import *
 import math
 
 # Space-time domain
@@ -12,8 +13,6 @@ dt = 0.5*dx                 # time step
 nt = 20                     # number of time steps
 ns = 0                      # numerical scheme
 
-M=Burgers(nx,dx,dt,ns)
-
 # Error staristics
 sigmab = 0.01              # background state error std
 sigmao = 0.001             # Observation error std
@@ -24,38 +23,27 @@ Lb = 0.05                  # Correlation length for B matrix
 precond = True              # preconditioning by square root of B 
 iobstsub = 5                # Frequency of temporal subsampling of observations, [1:nt], 1=every time step
 iobsxsub = 4                # Frequency of spatial subsampling of observations, [1:nx], 1=every space step
+seed = 0                    # Seed of the observation noise
 
-# Observation operator and error covariance matrix
-
-H = Obsopt(nx,iobsxsub,nt,iobstsub)
-R = sigmao*sigmao*np.eye(nx,nx)
-
-# Initialization of true field uo
-uo=np.sin(2*math.pi*xx);
-true=H.gen_obs(M,uo,sigmao)
-
-# Initialization of background
-ub=np.cos(2*math.pi*xx)
-ubkg=[ub]
-for it in range(nt):
-    ub=M.step(ub)
-    ubkg.append(ub)
-
-# Initialization of B matrix and its inverse
+# B matrix factorisation
 
 if precond:
     indic=2
 else:
     indic=1
-    
-B=gausscov(nx,sigmab,Lb,indic)
+
+# Model, observation operator (true field uo=sin, true trajectory and
+# observations), background trajectory (ub=cos) and B matrix, cached on disk
+
+M,H,B,true,ubkg = setup(nx,dt,nt,ns,sigmab,sigmao,Lb,iobsxsub,iobstsub,indic,seed)
+R = sigmao*sigmao*np.ones(H.nobs)  # diagonal R, as a vector of variances
 
 var=Variational(ubkg[0],nt,B,M,H,R,precond)
 
 J=0.
 alpha=0.001
 
-uopt= np.random.normal(0.,sigmab,uo.size)
+uopt= np.random.normal(0.,sigmab,nx)
 
 Jini  = var.cost(uopt)
 grini = var.grad(uopt)
@@ -63,6 +51,6 @@ norm  = grini.dot(grini)
 for iii in range(1,21):
     uctl = uopt + alpha * grini
     J = var.cost(uctl)
-    print alpha, (J-Jini)/(alpha*norm)
+    print(alpha, (J-Jini)/(alpha*norm))
     alpha /= 10.
 
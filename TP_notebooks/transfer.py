@@ -0,0 +1,34 @@
+import numpy as np
+import scipy.sparse as sp
+
+class Transfer:
+
+    def __init__(self,nx,r):
+        '''
+        Grid transfer between a periodic 1D grid of nx points and the coarse
+        grid made of every r-th point
+        Entries:
+        nx : number of fine grid points (multiple of r)
+        r  : coarsening factor
+        '''
+        if nx%r!=0:
+            raise ValueError('nx must be a multiple of the coarsening factor')
+        self.nx=nx
+        self.r=r
+        self.nc=nx//r
+
+        # prolongation by linear interpolation between coarse points
+        rows=np.arange(nx)
+        left=rows//r
+        w=(rows%r)/r
+        self.mat=sp.csr_matrix((np.concatenate((1.-w,w)),
+                                (np.concatenate((rows,rows)),
+                                 np.concatenate((left,(left+1)%self.nc)))),
+                               shape=(nx,self.nc))
+
+    def prolong(self,uc):
+        return self.mat.dot(uc)
+
+    def restrict(self,u):
+        # full weighting, the scaled transpose of the prolongation
+        return self.mat.T.dot(u)/self.r
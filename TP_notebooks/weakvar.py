@@ -0,0 +1,269 @@
+import functools
+import numpy as np
+from scipy.linalg import eigh
+from concurrent.futures import ProcessPoolExecutor
+try:
+    from . import obscov
+except ImportError: # run as a script from TP_notebooks
+    import obscov
+
+# Model, observation operator and error inverses seen by the sub-window
+# evaluations of a worker process (set once per process by _init); in
+# serial mode each WeakVariational passes its own context instead
+_ctx={}
+
+def _context(M,H,Rinv,Qisqr):
+    return {'M':M,'H':H,'Rinv':Rinv,'Qisqr':Qisqr}
+
+def _init(M,H,Rinv,Qisqr):
+    _ctx.update(_context(M,H,Rinv,Qisqr))
+
+def _qfactors(Q,floor):
+    '''
+    Symmetric square roots of Q and of its inverse, from the eigen
+    decomposition of Q.mat, the eigenvalues being raised to floor times the
+    largest one (a white noise part of the model error, which bounds the
+    condition number of Q by 1/floor). No inverse if floor is 0
+    '''
+    lam,V=eigh(Q.mat)
+    lam=np.maximum(lam,floor*lam.max())
+    sqr=(V*np.sqrt(lam)).dot(V.T)
+    if floor<=0.:
+        return sqr, None
+    return sqr, (V/np.sqrt(lam)).dot(V.T)
+
+def _forward(t0,t1,last,x,ctx):
+    '''
+    Forward sweep over one sub-window from its initial state x
+     Returns Jo (not halved), the trajectory from t0 to t1-1 and the
+     state at t1, whose observations are only counted for the last
+     sub-window
+    '''
+    M=ctx['M']
+    H=ctx['H']
+    Rinv=ctx['Rinv']
+
+    u=x
+    u_trj=list()
+    J=0.
+    for it in range(t0,t1):
+        u_trj.append(u)
+        if H.isobserved(it):
+            misfit=H.misfit(it,u)
+            J=J+misfit.dot(obscov.apply(Rinv,misfit))
+        u=M.step(u)
+
+    if last and H.isobserved(t1):
+        misfit=H.misfit(t1,u)
+        J=J+misfit.dot(obscov.apply(Rinv,misfit))
+    return J, u_trj, u
+
+def _backward(t0,t1,last,u_trj,u,uad,ctx):
+    '''
+    Adjoint sweep over one sub-window
+     Entries:
+     u_trj, u : trajectory and final state of _forward
+     uad : gradient with respect to the state at t1
+     Returns the gradient with respect to the initial state
+    '''
+    M=ctx['M']
+    H=ctx['H']
+    Rinv=ctx['Rinv']
+
+    if last and H.isobserved(t1):
+        misfit=H.misfit(t1,u)
+        uad=uad+H.adj(t1,obscov.apply(Rinv,misfit))
+
+    for itr in reversed(range(t0,t1)):
+        u=u_trj[itr-t0]
+        uad=M.step_adj(u,uad)
+        if H.isobserved(itr):
+            misfit=H.misfit(itr,u)
+            uad=uad+H.adj(itr,obscov.apply(Rinv,misfit))
+    return uad
+
+def _subwindow(args,ctx=None):
+    '''
+    Forward (and adjoint if indic==2) sweep over one sub-window of the
+    state formulation
+     Entries (packed in args):
+     t0, t1 : first and last time steps of the sub-window
+     last : True for the last sub-window (observations at t1 included,
+            no model error term at its end)
+     x : initial state of the sub-window
+     xnext : initial state of the next sub-window (None if last)
+     indic : 1 cost, 2 cost and gradient
+     ctx : model, observation operator, R^{-1} and Q^{-1/2} (those of the
+           worker process if None)
+     Returns the sub-window cost Jo+Jq (not halved), the gradient with
+     respect to x and Qinv.q, q being the model error at the end
+    '''
+    t0,t1,last,x,xnext,indic=args
+    if ctx is None:
+        ctx=_ctx
+
+    J,u_trj,u=_forward(t0,t1,last,x,ctx)
+    if last:
+        Qq=None
+        uad=np.zeros(ctx['M'].nx)
+    else:
+        r=ctx['Qisqr'].dot(xnext-u) # Q^{-1/2} q, q model error at the boundary
+        Qq=ctx['Qisqr'].dot(r)
+        J=J+r.dot(r)
+        uad=-Qq
+
+    if indic!=2:
+        return J, None, Qq
+    return J, _backward(t0,t1,last,u_trj,u,uad,ctx), Qq
+
+
+class WeakVariational:
+    def __init__(self,ubkg=None, nt=None, nsub=None, B=None, Q=None, M=None, H=None, R=None,
+                 nproc=None, formulation='forcing', qfloor=1.e-02):
+        '''
+        Weak-constraint 4D-Var, with the window split into nsub sub-windows
+        and model errors at the sub-window boundaries. Two formulations:
+         - 'forcing': the control vector is the initial state, preconditioned
+           by B^{1/2}, and the model error at each boundary, preconditioned
+           by Q^{1/2}, so that the Hessian of Jb+Jq is the identity and the
+           minimisation converges about as fast as the strong-constraint
+           one; the sub-windows are swept one after the other.
+         - 'state': the control variables are the initial states of the
+           sub-windows (B^{1/2} for the first one, Q^{1/2} for the others),
+           the model error being the misfit between a sub-window forecast
+           and the next initial state, penalised through Q^{-1/2}. The
+           sub-windows are independent and evaluated concurrently in a pool
+           of nproc processes (sequentially if nproc is None), only
+           boundary states being exchanged, but the problem is worse
+           conditioned: more iterations, bounded by qfloor.
+        Q^{1/2} and Q^{-1/2} come from the eigendecomposition of Q.mat, Q
+        itself is never inverted.
+         Entries:
+         ubkg : background trajectory (list of nt+1 states)
+         nt : number of time steps of the window
+         nsub : number of sub-windows
+         B : background error covariance (gausscov with sqr)
+         Q : model error covariance (gausscov)
+         M, H, R : model, observation operator and observation error covariance
+         nproc : number of worker processes ('state' only)
+         formulation : 'forcing' or 'state'
+         qfloor : eigenvalues of Q raised to qfloor times the largest one
+                  ('state' only, see _qfactors)
+        '''
+        if formulation not in ('forcing','state'):
+            raise ValueError('unknown formulation in WeakVariational')
+        if formulation=='forcing' and nproc is not None:
+            raise ValueError('the forcing formulation sweeps the sub-windows sequentially')
+        self.B=B
+        self.Q=Q
+        self.M=M
+        self.H=H
+        self.Rinv=obscov.inverse(R)
+        self.forcing=formulation=='forcing'
+        self.Qsqr,self.Qisqr=_qfactors(Q,0. if self.forcing else qfloor)
+        self.nt=nt
+        self.nsub=nsub
+        self.bounds=[ (k*nt)//nsub for k in range(nsub+1) ]
+        self.xbkg=[ ubkg[t] for t in self.bounds[:-1] ]
+        self.ctx=_context(M,H,self.Rinv,self.Qisqr)
+        if nproc is None:
+            self.sweep=functools.partial(_subwindow,ctx=self.ctx)
+            self.pool=None
+        else:
+            self.pool=ProcessPoolExecutor(nproc,initializer=_init,
+                                          initargs=(M,H,self.Rinv,self.Qisqr))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool=None
+
+    def ctl2state(self,v):
+        '''
+        Initial states of the sub-windows from the control vector
+        '''
+        nx=self.M.nx
+        x=[ self.xbkg[0] + self.B.sqr.dot(v[:nx]) ]
+        for k in range(1,self.nsub):
+            vk=v[k*nx:(k+1)*nx]
+            if self.forcing:
+                u=x[-1]
+                for it in range(self.bounds[k-1],self.bounds[k]):
+                    u=self.M.step(u)
+                x.append(u + self.Qsqr.dot(vk))
+            else:
+                x.append(self.xbkg[k] + self.Qsqr.dot(vk))
+        return x
+
+    def cost(self,v):
+
+        f = self.simvar(v,1)
+
+        return f
+
+    def grad(self,v):
+
+        g = self.simvar(v,2)
+
+        return g
+
+    def simvar(self,v,indic):
+        if self.forcing:
+            return self.simvar_forcing(v,indic)
+
+        nx=self.M.nx
+        x=self.ctl2state(v)
+        args=[ (self.bounds[k],self.bounds[k+1],k==self.nsub-1,x[k],
+                None if k==self.nsub-1 else x[k+1],indic)
+               for k in range(self.nsub) ]
+        if self.pool is None:
+            res=list(map(self.sweep,args))
+        else:
+            res=list(self.pool.map(_subwindow,args))
+
+        Jb=v[:nx].dot(v[:nx])
+        J=0.5*(Jb+sum(r[0] for r in res))
+        if indic!=2:
+            return J
+
+        g=np.zeros(v.size)
+        for k in range(self.nsub):
+            xad=res[k][1]
+            if k>0:
+                xad=xad+res[k-1][2] # d(q^T Qinv q)/dx_k
+            if k==0:
+                g[:nx]=self.B.sqr.T.dot(xad) + v[:nx]
+            else:
+                g[k*nx:(k+1)*nx]=self.Qsqr.T.dot(xad)
+        return g
+
+    def simvar_forcing(self,v,indic):
+        '''
+        Cost and gradient of the forcing formulation: the initial state of
+        sub-window k>0 is the forecast of sub-window k-1 plus Q^{1/2} v_k
+        '''
+        nx=self.M.nx
+        J=v.dot(v) # Jb + Jq
+        sweeps=[]
+        for k in range(self.nsub):
+            t0,t1,last=self.bounds[k],self.bounds[k+1],k==self.nsub-1
+            if k==0:
+                x=self.xbkg[0] + self.B.sqr.dot(v[:nx])
+            else:
+                x=u + self.Qsqr.dot(v[k*nx:(k+1)*nx])
+            Jo,u_trj,u=_forward(t0,t1,last,x,self.ctx)
+            J=J+Jo
+            sweeps.append((u_trj,u))
+        if indic!=2:
+            return 0.5*J
+
+        g=np.array(v,dtype=float)
+        uad=np.zeros(nx)
+        for k in reversed(range(self.nsub)):
+            t0,t1,last=self.bounds[k],self.bounds[k+1],k==self.nsub-1
+            uad=_backward(t0,t1,last,sweeps[k][0],sweeps[k][1],uad,self.ctx)
+            if k==0:
+                g[:nx]+=self.B.sqr.T.dot(uad)
+            else:
+                g[k*nx:(k+1)*nx]+=self.Qsqr.T.dot(uad)
+        return g